@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+#
+#  changelog_scale.py
+"""
+Benchmark how :mod:`sphinx_toolbox_experimental.changelog` scales with the number of changelog entries.
+
+A synthetic Sphinx project is generated for each number of entries, with the
+:rst:dir:`versionadded` and :rst:dir:`versionchanged` directives spread over a number of modules and versions.
+The project is built with the HTML builder, and the following are reported:
+
+* the time taken to read the documents, and the time spent in ``Change``, ``Changelog``
+  and ``ChangelogSectionTransform`` while reading;
+* the time spent rendering the changelog (``ChangelogResolver``) while writing;
+* the size of the pickled changelog (see :func:`~sphinx_toolbox_experimental.changelog.get_changelog_size`)
+  and of the pickled environment;
+* the peak resident set size of the build.
+
+Each build runs in a separate process, so the peak RSS of one build does not hide that of the next.
+
+Usage::
+
+	python benchmarks/changelog_scale.py [--entries 1000 10000 100000] [--modules 100] [--versions 10]
+"""
+#
+# Copyright (c) 2021 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# * Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in the
+#   documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+# stdlib
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from functools import wraps
+from io import StringIO
+from typing import Any, Callable, Dict, List, Optional
+
+# 3rd party
+from domdf_python_tools.paths import PathPlus
+from sphinx.application import Sphinx
+
+# this package
+from sphinx_toolbox_experimental import changelog
+
+__all__ = ["generate_project", "main", "run_benchmark"]
+
+_timings: Dict[str, float] = Counter()
+
+
+def _timed(label: str, func: Callable) -> Callable:
+	# Wraps the function to add the time spent in it to _timings[label].
+
+	@wraps(func)
+	def wrapper(*args, **kwargs) -> Any:  # noqa: MAN002
+		start = time.perf_counter()
+		try:
+			return func(*args, **kwargs)
+		finally:
+			_timings[label] += time.perf_counter() - start
+
+	return wrapper
+
+
+def generate_project(srcdir: PathPlus, entries: int, modules: int = 100, versions: int = 10) -> None:
+	"""
+	Write a synthetic Sphinx project with the given number of changelog entries.
+
+	Each module is documented on its own page, with one function per entry.
+	Every fourth entry is a :rst:dir:`versionchanged` directive, and the rest are :rst:dir:`versionadded` directives.
+	The entries are spread evenly over the modules and the versions.
+
+	:param srcdir: The directory to write the project to.
+	:param entries: The total number of changelog entries.
+	:param modules: The number of modules.
+	:param versions: The number of versions.
+	"""
+
+	version_numbers = [f"1.{idx}.0" for idx in range(versions)]
+	pages: List[List[str]] = [[] for _ in range(modules)]
+
+	for idx in range(entries):
+		module_idx = idx % modules
+		version = version_numbers[idx % versions]
+		page = pages[module_idx]
+
+		page.append(f".. py:function:: func{idx}(a, b)")
+		page.append('')
+		page.append(f"\tFunction number {idx}.")
+		page.append('')
+
+		if idx % 4 == 3:
+			page.append(f"\t.. versionchanged:: {version}")
+			page.append('')
+			page.append(f"\t\tNow returns :class:`int` rather than :class:`str`, see :func:`func{idx - 1}`.")
+		else:
+			page.append(f"\t.. versionadded:: {version}")
+
+		page.append('')
+
+	(srcdir / "api").maybe_make(parents=True)
+
+	for module_idx, page in enumerate(pages):
+		title = f"mod{module_idx}"
+		header = [title, '=' * len(title), '', f".. py:module:: benchpkg.mod{module_idx}", '']
+		(srcdir / "api" / f"mod{module_idx}.rst").write_lines(header + page)
+
+	changelog_page = ["Changelog", "=========", '']
+	for version in reversed(version_numbers):
+		changelog_page.extend([version, '-' * len(version), '', f".. changelog:: {version}", ''])
+	(srcdir / "changelog.rst").write_lines(changelog_page)
+
+	index = ["Benchmark", "=========", '', ".. toctree::", '', "\tchangelog"]
+	index.extend(f"\tapi/mod{module_idx}" for module_idx in range(modules))
+	(srcdir / "index.rst").write_lines(index)
+
+	(srcdir / "conf.py").write_lines([
+			'project = "benchpkg"',
+			'extensions = ["sphinx_toolbox_experimental.changelog"]',
+			])
+
+
+def run_benchmark(entries: int, modules: int = 100, versions: int = 10) -> Dict[str, float]:
+	"""
+	Generate and build a synthetic project, and return the measurements.
+
+	The peak RSS is that of the current process, so this should be run in a fresh process.
+
+	:param entries: The total number of changelog entries.
+	:param modules: The number of modules.
+	:param versions: The number of versions.
+	"""
+
+	changelog.Change.run = _timed("change", changelog.Change.run)  # type: ignore
+	changelog.Changelog.run = _timed("changelog", changelog.Changelog.run)  # type: ignore
+	changelog.ChangelogSectionTransform.apply = _timed(  # type: ignore
+			"section_transform", changelog.ChangelogSectionTransform.apply
+			)
+	changelog.ChangelogResolver.run = _timed("render", changelog.ChangelogResolver.run)  # type: ignore
+
+	with tempfile.TemporaryDirectory() as tmpdir:
+		srcdir = PathPlus(tmpdir) / "src"
+		outdir = PathPlus(tmpdir) / "build"
+		doctreedir = outdir / ".doctrees"
+		generate_project(srcdir, entries, modules, versions)
+
+		app = Sphinx(
+				str(srcdir),
+				str(srcdir),
+				str(outdir),
+				str(doctreedir),
+				"html",
+				status=None,
+				warning=StringIO(),
+				freshenv=True,
+				)
+
+		phases: Dict[str, float] = {}
+
+		def start_reading(*args) -> None:  # noqa: MAN002
+			phases["read_start"] = time.perf_counter()
+
+		def end_reading(*args) -> None:  # noqa: MAN002
+			phases["read_end"] = time.perf_counter()
+
+		app.connect("env-before-read-docs", start_reading)
+		app.connect("env-updated", end_reading)
+
+		start = time.perf_counter()
+		app.build()
+		end = time.perf_counter()
+
+		size = changelog.get_changelog_size(app.env.changelog)  # type: ignore
+		env_pickle = (doctreedir / "environment.pickle").stat().st_size
+
+	max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	if sys.platform != "darwin":
+		# Linux reports kilobytes, macOS bytes.
+		max_rss *= 1024
+
+	return {
+			"entries": size["entries"],
+			"versions": size["versions"],
+			"read": phases["read_end"] - phases["read_start"],
+			"change": _timings["change"],
+			"changelog": _timings["changelog"],
+			"section_transform": _timings["section_transform"],
+			"render": _timings["render"],
+			"total": end - start,
+			"changelog_pickle": size["pickle"],
+			"env_pickle": env_pickle,
+			"max_rss": max_rss,
+			}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+	"""
+	Run the benchmark for each number of entries, and print the results as a table or as JSON.
+
+	:param argv: The command line arguments. Defaults to :py:obj:`sys.argv`.
+	"""
+
+	parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+	parser.add_argument(
+			"--entries",
+			type=int,
+			nargs='+',
+			default=[1000, 10000, 100000],
+			help="The numbers of changelog entries to benchmark.",
+			)
+	parser.add_argument("--modules", type=int, default=100, help="The number of modules.")
+	parser.add_argument("--versions", type=int, default=10, help="The number of versions.")
+	parser.add_argument("--json", action="store_true", help="Write the results as JSON, one object per line.")
+	args = parser.parse_args(argv)
+
+	if len(args.entries) == 1:
+		result = run_benchmark(args.entries[0], args.modules, args.versions)
+		if args.json:
+			print(json.dumps(result))
+			return 0
+		results = [result]
+	else:
+		# Run each size in a fresh process, so the peak RSS is measured separately.
+		results = []
+		for entries in args.entries:
+			command = [
+					sys.executable,
+					os.path.abspath(__file__),
+					"--entries",
+					str(entries),
+					"--modules",
+					str(args.modules),
+					"--versions",
+					str(args.versions),
+					"--json",
+					]
+			output = subprocess.run(command, check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+			results.append(json.loads(output.strip().splitlines()[-1]))
+
+	if args.json:
+		for result in results:
+			print(json.dumps(result))
+		return 0
+
+	print(
+			f"{'entries':>8} {'read':>8} {'Change':>8} {'Changelog':>9} {'sections':>8} {'render':>8} {'total':>8} "
+			f"{'pickle':>10} {'env':>10} {'max RSS':>10}"
+			)
+
+	for result in results:
+		print(
+				f"{result['entries']:>8} {result['read']:>7.2f}s {result['change']:>7.2f}s "
+				f"{result['changelog']:>8.3f}s {result['section_transform']:>7.3f}s {result['render']:>7.2f}s "
+				f"{result['total']:>7.2f}s {result['changelog_pickle'] / 1024:>8.0f}KB "
+				f"{result['env_pickle'] / 1024:>8.0f}KB {result['max_rss'] / 1048576:>8.0f}MB"
+				)
+
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
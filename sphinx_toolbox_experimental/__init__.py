@@ -54,4 +54,4 @@ def setup(app: Sphinx):
 	app.setup_extension("sphinx_toolbox_experimental.rst_field")
 	app.setup_extension("sphinx_toolbox_experimental.toml")
 
-	return {"version": __version__}
+	return {"version": __version__, "parallel_read_safe": True, "parallel_write_safe": True}
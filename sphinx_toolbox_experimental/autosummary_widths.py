@@ -34,29 +34,79 @@ Sphinx extension to allow customisation of column widths in autosummary tables w
 #
 
 # stdlib
+import inspect
+import multiprocessing
+import os
 import re
+import sys
+from collections import Counter, OrderedDict
 from contextlib import suppress
 from fractions import Fraction
 from itertools import chain
-from typing import Iterable, List, Optional, Tuple, cast
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, cast
 
 # 3rd party
 import dict2css  # nodep
 from docutils import nodes
+from docutils.frontend import OptionParser
 from docutils.parsers.rst import directives
+from docutils.parsers.rst.states import Body
 from docutils.statemachine import StringList
 from domdf_python_tools import stringlist
 from domdf_python_tools.paths import PathPlus
 from sphinx import addnodes
 from sphinx.application import Sphinx
 from sphinx.config import Config
-from sphinx.ext.autosummary import autosummary_table
-from sphinx.util import rst
-from sphinx.util.docutils import SphinxDirective, switch_source_input
+from sphinx.environment import BuildEnvironment
+from sphinx.ext.autodoc import Options
+from sphinx.ext.autodoc.directive import DocumenterBridge
+from sphinx.ext.autosummary import autosummary_table, get_import_prefixes_from_env
+from sphinx.parsers import RSTParser
+from sphinx.util import logging, rst
+from sphinx.util.docutils import SphinxDirective, new_document, switch_source_input
 from sphinx_toolbox import latex  # nodep
 from sphinx_toolbox.more_autosummary import PatchedAutosummary  # nodep
 
-__all__ = ["AutosummaryWidths", "WidthsDirective", "configure", "setup"]
+__all__ = [
+		"AutosummaryWidths",
+		"WidthsDirective",
+		"close_worker_pool",
+		"configure",
+		"get_worker_pool",
+		"init_items_cache",
+		"init_worker_pool",
+		"merge_items_cache",
+		"purge_items_cache",
+		"report_items_cache",
+		"setup",
+		]
+
+logger = logging.getLogger(__name__)
+
+_ItemType = Tuple[str, str, str, str]
+
+# The result of importing an item: the name, the item (if it was imported), and the files the object is defined in.
+_ImportResult = Tuple[str, Optional[_ItemType], Tuple[str, ...]]
+
+# The application in the main process, inherited by the forked worker processes.
+_pool_app: Optional[Sphinx] = None
+
+
+# The constructs other than paragraphs which can start a block of reStructuredText.
+_block_markup = [
+		re.compile(Body.patterns[name]) if isinstance(Body.patterns[name], str) else Body.patterns[name]
+		for name in Body.initial_transitions
+		if name != "text"
+		]
+
+
+def _is_inline_only(text: str) -> bool:
+	# Returns whether the text would be parsed as a single paragraph, so only needs the inline parser.
+	if '\n' in text or text != text.strip() or text.endswith("::"):
+		return False
+
+	return not any(pattern.match(text) for pattern in _block_markup)
 
 
 class AutosummaryWidths(PatchedAutosummary):
@@ -64,6 +114,118 @@ class AutosummaryWidths(PatchedAutosummary):
 	Customised :rst:dir:`autosummary` directive with customisable width with the LaTeX builder.
 	"""
 
+	def get_items(self, names: List[str]) -> List[_ItemType]:
+		"""
+		Try to import the given names, and return a list of ``[(name, signature, summary_string, real_name), ...]``.
+
+		The results are cached in the environment (see :func:`~.init_items_cache`),
+		so objects in modules which have not been modified since they were last imported are not imported again.
+
+		:param names:
+		"""
+
+		cache = getattr(self.env, "autosummary_widths_cache", None)
+		if cache is None:
+			return [item for _, item, _ in self.import_items(names) if item is not None]
+
+		cache_size = self.config.autosummary_widths_cache_size
+		stats = self.env.autosummary_widths_cache_stats.setdefault(self.env.docname, Counter())  # type: ignore
+		prefixes = tuple(get_import_prefixes_from_env(self.env))
+		cached = {}
+		missing = []
+
+		for name in names:
+			key = (name, prefixes)
+			entry = cache.get(key)
+
+			if entry is not None:
+				mtimes, item = entry
+
+				if all(_get_mtime(filename) == mtime for filename, mtime in mtimes):
+					cache.move_to_end(key)
+					stats["hits"] += 1
+					cached[name] = item
+					continue
+
+				del cache[key]
+				stats["invalidated"] += 1
+
+			stats["misses"] += 1
+			missing.append(name)
+
+		for name, item, filenames in self.import_items(missing):
+			if item is None:
+				continue
+
+			cached[name] = item
+			if filenames:
+				cache[(name, prefixes)] = (tuple((filename, _get_mtime(filename)) for filename in filenames), item)
+
+		while len(cache) > cache_size:
+			cache.popitem(last=False)
+			stats["evicted"] += 1
+
+		return [cached[name] for name in names if name in cached]
+
+	#: The files which the last object imported by :meth:`~.import_by_name` may have been documented from.
+	imported_files: Tuple[str, ...] = ()
+
+	def import_by_name(self, name: str, prefixes: List[Optional[str]]) -> Tuple[str, Any, Any, str]:
+		"""
+		Import the object with the given name, and record the files it is defined in.
+
+		:param name:
+		:param prefixes:
+
+		:return: The real name of the object, the object, the parent of the object, and the name of the module.
+		"""
+
+		real_name, obj, parent, modname = super().import_by_name(name, prefixes)
+		self.imported_files = _get_source_files(real_name, obj)
+		return real_name, obj, parent, modname
+
+	def import_items(self, names: List[str]) -> List[_ImportResult]:
+		"""
+		Import the given names, returning the name, the item for the table, and the files the object is defined in.
+
+		The item is :py:obj:`None` if the name could not be imported.
+		If the ``autosummary_widths_workers`` option is set the names are imported in worker processes
+		(see :func:`~.get_worker_pool`), otherwise they are imported in the current process.
+
+		:param names:
+		"""
+
+		if not names:
+			return []
+
+		pool = get_worker_pool(self.env.app)
+		if pool is None:
+			return _import_items(self, names)
+
+		# Names with the same parent (usually the module) are imported by the same worker.
+		groups: Dict[str, List[str]] = {}
+		for name in names:
+			groups.setdefault(name.lstrip('~').rpartition('.')[0], []).append(name)
+
+		context = {
+				"docname": self.env.docname,
+				"source_info": self.get_source_info(),
+				"tab_width": self.state.document.settings.tab_width,
+				"ref_context": {key: self.env.ref_context.get(key) for key in ("py:module", "py:class")},
+				"temp_data": {key: self.env.temp_data.get(key) for key in ("autodoc:module", "autodoc:class")},
+				}
+
+		tasks = [(context, group) for group in groups.values()]
+		results: Dict[str, _ImportResult] = {}
+
+		for group_results, logs in pool.imap(_import_items_worker, tasks):
+			for log in logs:
+				logger.handle(log)
+			for result in group_results:
+				results[result[0]] = result
+
+		return [results[name] for name in names]
+
 	def get_table(self, items: List[Tuple[str, str, str, str]]) -> List[nodes.Node]:
 		"""
 		Generate a proper list of table nodes for autosummary:: directive.
@@ -76,10 +238,10 @@ class AutosummaryWidths(PatchedAutosummary):
 		# table_spec['spec'] = r'\Xx{3}{8}\Xx{5}{8}'
 		# table_spec['spec'] = r'\Xx{7}{16}\Xx{9}{16}'
 
-		widths = tuple(chain.from_iterable(getattr(self.state.document, "autosummary_widths", ((1, 2), (1, 2)))))
+		widths = tuple(chain.from_iterable(self.env.temp_data.get("autosummary_widths", ((1, 2), (1, 2)))))
 		assert len(widths) == 4
 
-		html_widths = getattr(self.state.document, "autosummary_html_widths", ((1, 10), (9, 10)))
+		html_widths = self.env.temp_data.get("autosummary_html_widths", ((1, 10), (9, 10)))
 		assert len(html_widths) == 2
 
 		if "latex" in self.env.app.config.autosummary_widths_builders:
@@ -89,10 +251,18 @@ class AutosummaryWidths(PatchedAutosummary):
 
 		table = autosummary_table('')
 
-		if "html" in self.env.app.config.autosummary_widths_builders:
-			real_table = nodes.table('', classes=["longtable", "autosummary"])
+		# Short tables don't need to span pages, and the LaTeX builder then uses
+		# tabulary instead, which doesn't need additional LaTeX runs to settle the column widths.
+		longtable_rows = self.env.app.config.autosummary_widths_longtable_rows
+		if len(items) >= longtable_rows:
+			classes = ["longtable"]
 		else:
-			real_table = nodes.table('', classes=["longtable"])
+			classes = []
+
+		if "html" in self.env.app.config.autosummary_widths_builders:
+			classes.append("autosummary")
+
+		real_table = nodes.table('', classes=classes)
 
 		table.append(real_table)
 
@@ -109,25 +279,7 @@ class AutosummaryWidths(PatchedAutosummary):
 		body = nodes.tbody('')
 		group.append(body)
 
-		def append_row(*column_texts: str) -> None:
-			row = nodes.row('')
-			source, line = self.state_machine.get_source_and_line()
-
-			for text in column_texts:
-				node = nodes.paragraph('')
-				vl = StringList()
-				vl.append(text, f"{source}:{line:d}:<autosummary>")
-
-				with switch_source_input(self.state, vl):
-					self.state.nested_parse(vl, 0, node)
-
-					with suppress(IndexError):
-						if isinstance(node[0], nodes.paragraph):
-							node = node[0]
-
-					row.append(nodes.entry('', node))
-
-			body.append(row)
+		rows = []
 
 		for name, sig, summary, real_name in items:
 			col1 = f":obj:`{name} <{real_name}>`"
@@ -138,10 +290,77 @@ class AutosummaryWidths(PatchedAutosummary):
 				else:
 					col1 += f"\\ {rst.escape(sig)}"
 
-			append_row(col1, summary)
+			rows.append((col1, summary))
+
+		for row_cells in self.parse_cells(rows):
+			row = nodes.row('')
+			for cell in row_cells:
+				row.append(nodes.entry('', *cell))
+			body.append(row)
 
 		return [table_spec, table]
 
+	def parse_cells(self, rows: List[Tuple[str, str]]) -> List[List[List[nodes.Node]]]:
+		"""
+		Parse the reStructuredText in the cells of the table.
+
+		Cells consisting of a single line of text, which would be parsed as a paragraph,
+		are passed directly to the inline parser rather than each invoking the full parser.
+		Other cells are parsed individually with :meth:`~.parse_cell`.
+		The nodes for each cell are followed by any system messages from parsing it.
+
+		:param rows: The text of the cells in each row of the table.
+		"""
+
+		source, line = self.state_machine.get_source_and_line()
+		source_name = f"{source}:{line:d}:<autosummary>"
+
+		# Line numbers from the inline parser are relative to this input.
+		vl = StringList()
+		parsed_rows = []
+
+		with switch_source_input(self.state, vl):
+			for row in rows:
+				parsed_row = []
+
+				for text in row:
+					if not text:
+						parsed_row.append([nodes.paragraph('')])
+					elif _is_inline_only(text):
+						vl.append(text, source_name)
+						textnodes, messages = self.state.inline_text(text, len(vl))
+						node = nodes.paragraph(text, '', *textnodes)
+						node.source, node.line = source_name, 1
+						# As in docutils' Body.paragraph, the messages follow the paragraph.
+						parsed_row.append([node, *messages])
+					else:
+						parsed_row.append([self.parse_cell(text, source_name)])
+
+				parsed_rows.append(parsed_row)
+
+		return parsed_rows
+
+	def parse_cell(self, text: str, source_name: str) -> nodes.Element:
+		"""
+		Parse the reStructuredText in a single cell of the table.
+
+		:param text:
+		:param source_name: The source of the text, for error messages.
+		"""
+
+		node = nodes.paragraph('')
+		vl = StringList()
+		vl.append(text, source_name)
+
+		with switch_source_input(self.state, vl):
+			self.state.nested_parse(vl, 0, node)
+
+			with suppress(IndexError):
+				if isinstance(node[0], nodes.paragraph):
+					node = node[0]
+
+		return node
+
 
 class WidthsDirective(SphinxDirective):
 	"""
@@ -180,12 +399,282 @@ class WidthsDirective(SphinxDirective):
 		else:
 			html_widths = [(1, 10), (9, 10)]
 
-		self.state.document.autosummary_widths = self.parse_widths(self.arguments)  # type: ignore[attr-defined]
-		self.state.document.autosummary_html_widths = html_widths  # type: ignore[attr-defined]
+		# temp_data is cleared after each document is read.
+		self.env.temp_data["autosummary_widths"] = self.parse_widths(self.arguments)
+		self.env.temp_data["autosummary_html_widths"] = html_widths
 
 		return []
 
 
+def _import_items(directive: AutosummaryWidths, names: List[str]) -> List[_ImportResult]:
+	results: List[_ImportResult] = []
+
+	for name in names:
+		directive.imported_files = ()
+		items = super(AutosummaryWidths, directive).get_items([name])
+
+		if len(items) == 1:
+			results.append((name, items[0], directive.imported_files))
+		else:
+			results.append((name, None, ()))
+
+	return results
+
+
+class _WorkerDirective(AutosummaryWidths):
+	# Stands in for the autosummary directive in a worker process.
+
+	def __init__(self, env: BuildEnvironment, source_info: Tuple[str, int], tab_width: int):
+		settings = OptionParser(
+				components=(RSTParser, ),
+				defaults=env.settings,
+				read_config_files=True,
+				).get_default_values()
+		settings.tab_width = tab_width
+		document = new_document(source_info[0], settings)
+
+		self.lineno = source_info[1]
+		self.state = SimpleNamespace(document=document)
+		self.bridge = DocumenterBridge(env, document.reporter, Options(), self.lineno, self.state)
+		self._source_info = source_info
+
+	def get_source_info(self) -> Tuple[str, int]:
+		return self._source_info
+
+
+def _import_items_worker(task: Tuple[Dict[str, Any], List[str]]) -> Tuple[List[_ImportResult], List[Any]]:
+	# Runs in a worker process, returning only the plain items and the log records to emit in the main process.
+	context, names = task
+
+	assert _pool_app is not None
+	env = _pool_app.env
+	env.temp_data.clear()
+	env.temp_data["docname"] = context["docname"]
+	env.temp_data.update(context["temp_data"])
+	env.ref_context.clear()
+	env.ref_context.update({key: value for key, value in context["ref_context"].items() if value is not None})
+
+	collector = logging.LogCollector()
+	with collector.collect():
+		results = _import_items(_WorkerDirective(env, context["source_info"], context["tab_width"]), names)
+
+	logging.convert_serializable(collector.logs)
+	return results, collector.logs
+
+
+def init_worker_pool(app: Sphinx) -> None:
+	"""
+	Record the process which may create the pool of worker processes.
+
+	Under ``sphinx-build -j N`` the documents may be read in processes forked from this one.
+	Those processes already keep imported modules out of the main process,
+	so they import the objects themselves rather than each creating a pool.
+
+	:param app: The Sphinx application.
+	"""
+
+	app.autosummary_widths_pool = None  # type: ignore
+	app.autosummary_widths_pool_pid = None  # type: ignore
+
+	if not app.config.autosummary_widths_workers:
+		return
+
+	if "fork" not in multiprocessing.get_all_start_methods():
+		logger.warning("autosummary_widths_workers requires the 'fork' start method; importing in the main process.")
+		return
+
+	app.autosummary_widths_pool_pid = os.getpid()  # type: ignore
+
+
+def get_worker_pool(app: Sphinx) -> Optional[Any]:
+	"""
+	Returns the pool of worker processes used to import the objects in :rst:dir:`autosummary` tables,
+	or :py:obj:`None` if the objects should be imported in the current process.
+
+	The pool is only used if the ``autosummary_widths_workers`` option is set to the number of processes
+	and the ``fork`` start method is available, and only in the process which initialised the builder
+	(see :func:`~.init_worker_pool`). The workers are forked from that process,
+	so modules imported by the workers do not use memory in the main process.
+	Each worker is replaced after importing objects from ``autosummary_widths_worker_max_tasks`` modules.
+
+	:param app: The Sphinx application.
+	"""  # noqa: D400
+
+	global _pool_app
+
+	if getattr(app, "autosummary_widths_pool_pid", None) != os.getpid():
+		return None
+
+	pool = getattr(app, "autosummary_widths_pool", None)
+	if pool is not None:
+		return pool
+
+	_pool_app = app
+	pool = multiprocessing.get_context("fork").Pool(
+			app.config.autosummary_widths_workers,
+			maxtasksperchild=app.config.autosummary_widths_worker_max_tasks or None,
+			)
+	app.autosummary_widths_pool = pool  # type: ignore
+	return pool
+
+
+def close_worker_pool(app: Sphinx, env: BuildEnvironment) -> None:
+	"""
+	Shut down the pool of worker processes once all documents have been read.
+
+	:param app: The Sphinx application.
+	:param env: The Sphinx build environment.
+	"""
+
+	pool = getattr(app, "autosummary_widths_pool", None)
+	if pool is not None and app.autosummary_widths_pool_pid == os.getpid():  # type: ignore
+		pool.close()
+		pool.join()
+		app.autosummary_widths_pool = None  # type: ignore
+
+
+def _get_mtime(filename: str) -> Optional[int]:
+	try:
+		return os.stat(filename).st_mtime_ns
+	except OSError:
+		return None
+
+
+def _get_source_files(real_name: str, obj: Any) -> Tuple[str, ...]:
+	# Returns the files which the signature and summary of the object may come from:
+	# the module the object was imported from (which may re-export it), the file the object is defined in,
+	# and for classes the files their base classes are defined in (for inherited docstrings).
+	filenames = []
+	parts = real_name.split('.')
+
+	for idx in range(len(parts), 0, -1):
+		module = sys.modules.get('.'.join(parts[:idx]))
+		if module is not None:
+			filenames.append(getattr(module, "__file__", None))
+			break
+
+	for defining_obj in (inspect.getmro(obj) if inspect.isclass(obj) else (obj, )):
+		module = sys.modules.get(getattr(defining_obj, "__module__", None) or '')
+		if module is not None:
+			filenames.append(getattr(module, "__file__", None))
+
+		with suppress(TypeError):
+			filenames.append(inspect.getsourcefile(defining_obj))
+
+	return tuple(sorted({filename for filename in filenames if filename}))
+
+
+def _get_cache_key(config: Config) -> Tuple[Tuple[str, str], ...]:
+	# The configuration values which may affect the signatures and summaries of objects,
+	# and the version of the format of the cache entries.
+	key = [("format", "2")]
+
+	for name in config.values:
+		if name.startswith(("autodoc_", "autosummary_", "autoclass_")) and not name.startswith("autosummary_widths_"):
+			key.append((name, repr(config[name])))
+
+	return tuple(sorted(key))
+
+
+def init_items_cache(app: Sphinx) -> None:
+	"""
+	Initialise the cache of the items in :rst:dir:`autosummary` tables.
+
+	``env.autosummary_widths_cache`` maps the name of each object and the current module and class
+	to the files the object is defined in (including the module it was imported from, which may re-export it),
+	the modification times of those files, and the item for the table.
+	Entries are invalidated when any of the files are modified, and the whole cache is discarded when a configuration value
+	affecting autodoc or autosummary is changed.
+
+	The number of entries is limited by the ``autosummary_widths_cache_size`` option,
+	with the least recently used entries removed first. Setting the option to ``0`` disables the cache.
+
+	``env.autosummary_widths_cache_stats`` maps docnames to the number of cache hits, misses,
+	invalidated entries and evicted entries while reading that document in the current build.
+
+	:param app: The Sphinx application.
+	"""
+
+	env = app.env
+	config_key = _get_cache_key(app.config)
+
+	if not app.config.autosummary_widths_cache_size:
+		env.autosummary_widths_cache = None  # type: ignore
+	elif getattr(env, "autosummary_widths_cache", None) is None or env.autosummary_widths_cache_config != config_key:  # type: ignore
+		env.autosummary_widths_cache = OrderedDict()  # type: ignore
+
+	env.autosummary_widths_cache_config = config_key  # type: ignore
+	env.autosummary_widths_cache_stats = {}  # type: ignore
+
+
+def purge_items_cache(app: Sphinx, env: BuildEnvironment, docname: str) -> None:
+	"""
+	Remove the cache statistics for the given document.
+
+	:param app: The Sphinx application.
+	:param env: The Sphinx build environment.
+	:param docname: The name of the document.
+	"""
+
+	stats = getattr(env, "autosummary_widths_cache_stats", None)
+	if stats is not None:
+		stats.pop(docname, None)
+
+
+def merge_items_cache(
+		app: Sphinx,
+		env: BuildEnvironment,
+		docnames: Set[str],
+		other: BuildEnvironment,
+		) -> None:
+	"""
+	Merge the cache entries and statistics from a parallel read worker into the main environment.
+
+	:param app: The Sphinx application.
+	:param env: The main Sphinx build environment.
+	:param docnames: The names of the documents read by the worker.
+	:param other: The worker's build environment.
+	"""
+
+	cache = getattr(env, "autosummary_widths_cache", None)
+	if cache is None:
+		return
+
+	cache.update(other.autosummary_widths_cache)  # type: ignore
+	while len(cache) > app.config.autosummary_widths_cache_size:
+		cache.popitem(last=False)
+
+	for docname, doc_stats in other.autosummary_widths_cache_stats.items():  # type: ignore
+		if docname in docnames:
+			env.autosummary_widths_cache_stats[docname] = doc_stats  # type: ignore
+
+
+def report_items_cache(app: Sphinx, env: BuildEnvironment) -> None:
+	"""
+	Log the cache statistics when Sphinx is run in verbose mode.
+
+	:param app: The Sphinx application.
+	:param env: The Sphinx build environment.
+	"""
+
+	cache = getattr(env, "autosummary_widths_cache", None)
+	if not app.verbosity or cache is None:
+		return
+
+	stats: Dict[str, int] = Counter()
+	for doc_stats in env.autosummary_widths_cache_stats.values():  # type: ignore
+		stats.update(doc_stats)
+
+	logger.verbose(
+			"autosummary cache: %d hits, %d misses, %d invalidated, %d evicted, %d entries",
+			stats["hits"],
+			stats["misses"],
+			stats["invalidated"],
+			stats["evicted"],
+			len(cache),
+			)
+
+
 def configure(app: Sphinx, config: Config):
 	"""
 	Configure :mod:`sphinx_toolbox_experimental.autosummary_widths`.
@@ -226,12 +715,12 @@ def copy_asset_files(app: Sphinx, exception: Optional[Exception] = None):
 	css_static_dir.maybe_make(parents=True)
 
 	dict2css.dump(
-			{".longtable.autosummary": {"width": "100%"}},
+			{"table.autosummary": {"width": "100%"}},
 			css_static_dir / "autosummary-widths.css",
 			)
 
 
-def setup(app: Sphinx):
+def setup(app: Sphinx) -> Dict[str, Any]:
 	"""
 	Setup :mod:`sphinx_toolbox_experimental.autosummary_widths`.
 
@@ -239,9 +728,21 @@ def setup(app: Sphinx):
 	"""
 
 	app.add_config_value("autosummary_widths_builders", ["html", "latex"], rebuild="env", types=[list])
+	app.add_config_value("autosummary_widths_longtable_rows", 0, rebuild="env", types=[int])
+	app.add_config_value("autosummary_widths_cache_size", 10000, rebuild='', types=[int])
+	app.add_config_value("autosummary_widths_workers", 0, rebuild='', types=[int])
+	app.add_config_value("autosummary_widths_worker_max_tasks", 10, rebuild='', types=[int])
 	app.add_directive("autosummary", AutosummaryWidths, override=True)
 	app.add_directive("autosummary-widths", WidthsDirective)
 	app.connect("build-finished", latex.replace_unknown_unicode)
 	app.connect("build-finished", copy_asset_files)
 	app.connect("config-inited", configure)
+	app.connect("builder-inited", init_items_cache)
+	app.connect("builder-inited", init_worker_pool)
+	app.connect("env-purge-doc", purge_items_cache)
+	app.connect("env-merge-info", merge_items_cache)
+	app.connect("env-updated", report_items_cache)
+	app.connect("env-updated", close_worker_pool)
 	app.add_css_file("css/autosummary-widths.css")
+
+	return {"parallel_read_safe": True, "parallel_write_safe": True}
@@ -32,32 +32,148 @@ Sphinx extension which generates a changelog from ``versionadded`` and ``version
 #
 
 # stdlib
-import itertools
+import argparse
+import ast
+import copy
+import functools
+import hashlib
+import json
+import multiprocessing
+import os
+import pickle
 import re
-from collections import defaultdict
-from functools import partial
-from operator import itemgetter
-from typing import Any, Dict, List, Tuple, cast
+import sys
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
 
 # 3rd party
 from docutils import nodes
 from docutils.nodes import Node, fully_normalize_name
-from docutils.statemachine import StringList
-from domdf_python_tools import stringlist
+from docutils.io import StringOutput
+from docutils.parsers.rst import directives
+from domdf_python_tools.paths import PathPlus
 from first import first
+from packaging.version import InvalidVersion, Version
 from sphinx import addnodes
 from sphinx.application import Sphinx
-from sphinx.transforms import SphinxTransform
-from sphinx.util.docutils import SphinxDirective
+from sphinx.config import ENUM
+from sphinx.environment import BuildEnvironment
+from sphinx.transforms import SphinxTransform, SphinxTransformer
+from sphinx.transforms.post_transforms import SphinxPostTransform
+from sphinx.util import logging
+from sphinx.util.docutils import SphinxDirective, new_document
+from sphinx.util.matching import Matcher
 from sphinx.util.nodes import clean_astext
+from sphinx.util.osutil import relative_uri
 from sphinx.writers.latex import LaTeXTranslator
 from sphinx_toolbox.changeset import VersionChange  # nodep
-from sphinx_toolbox.utils import Purger  # nodep
 
-__all__ = ["Change", "Changelog", "builder_init", "setup"]
+__all__ = [
+		"Change",
+		"Changelog",
+		"ChangelogEntry",
+		"ChangelogResolver",
+		"ChangelogSectionTransform",
+		"builder_init",
+		"collect_changelog_pages",
+		"changelog_node",
+		"changelog_version_node",
+		"depart_changelog_version",
+		"exclude_changelog_from_search",
+		"get_changelog_size",
+		"get_updated_changelogs",
+		"is_changelog_document",
+		"iter_changelog_records",
+		"main",
+		"merge_changelog",
+		"purge_changelog",
+		"render_changelog_page",
+		"report_changelog_size",
+		"scan_changelog",
+		"scan_file",
+		"scan_lines",
+		"setup",
+		"visit_changelog_version",
+		"write_changelog_ndjson",
+		]
+
+logger = logging.getLogger(__name__)
+
+
+class ChangelogEntry(NamedTuple):
+	"""
+	A single entry in the changelog.
+
+	The strings are interned, as the same module names and object types are repeated across many entries.
+	"""
+
+	#: The module containing the object.
+	module: Optional[str]
+
+	#: The name of the object within the module, or :py:obj:`None` for the module itself.
+	object_name: Optional[str]
+
+	#: The nodes parsed from the directive's content. Empty for additions, as their bodies are not displayed.
+	body: Tuple[Node, ...]
+
+	#: The type of the object, e.g. ``'function'``.
+	object_type: str
+
+
+_ChangelogType = Dict[str, Dict[str, Dict[str, List[ChangelogEntry]]]]
+
+
+def _intern(string: Optional[str]) -> Optional[str]:
+	if string is None:
+		return None
+	return sys.intern(string)
+
+
+def _is_version_label(node: Node) -> bool:
+	return isinstance(node, nodes.inline) and "versionmodified" in node["classes"]
+
+
+def _copy_body(node: addnodes.versionmodified) -> List[Node]:
+	"""
+	Returns a copy of the parsed body of a :rst:dir:`versionadded` or :rst:dir:`versionchanged` directive,
+	without the "Changed in version ..." label.
+
+	The copy is detached from the document and stripped of default attributes,
+	so it can be stored compactly in the environment.
+
+	:param node:
+	"""  # noqa: D400
+
+	body = []
+
+	for child in node.children:
+		child = child.deepcopy()
+
+		for label in child.traverse(_is_version_label):
+			label.parent.remove(label)
+
+		if isinstance(child, nodes.paragraph) and len(child) == 1 and isinstance(child[0], nodes.inline):
+			# VersionChange wraps the text of the first paragraph in a translatable inline node.
+			if child[0].get("translatable"):
+				child[0].replace_self(child[0].children)
+
+		if isinstance(child, (nodes.paragraph, nodes.compound)) and not len(child):
+			continue
+
+		for subnode in child.traverse():
+			subnode.document = None
+
+			if isinstance(subnode, nodes.Element):
+				# The source location is not needed, and empty list attributes are recreated when the node is copied.
+				for attr in ("source", "line"):
+					subnode.__dict__.pop(attr, None)
 
-changelog_node_purger = Purger("all_changelog_node_nodes")
-_ChangelogType = Dict[str, List[Tuple[str, str, List[str], str]]]
+				for attr in subnode.list_attributes:
+					if not subnode.attributes.get(attr, True):
+						del subnode.attributes[attr]
+
+		body.append(child)
+
+	return body
 
 
 class Change(VersionChange):
@@ -65,21 +181,20 @@ class Change(VersionChange):
 	Modified versions of :rst:dir:`versionadded` and :rst:dir:`versionchanged` which compile a changelog.
 	"""
 
-	def add_changelog_entry(self, change_type: str):
+	def add_changelog_entry(self, change_type: str, node: addnodes.versionmodified):
 		"""
 		Record the current directive in the changelog.
 
 		:param change_type: The type of change (add / change).
+		:param node: The node created for the directive.
 		"""
 
-		body: List[str]
-
-		if len(self.arguments) == 2:
-			body = [self.arguments[1]]
+		if change_type == "add":
+			body: Tuple[Node, ...] = ()
 		else:
-			body = cast(List[str], self.content)
+			body = tuple(_copy_body(node))
 
-		version = self.arguments[0]
+		version = sys.intern(self.arguments[0])
 
 		module = self.env.ref_context.get("py:module")
 		object_name = first(self.env.temp_data.get("object", ()))
@@ -101,8 +216,17 @@ class Change(VersionChange):
 		else:
 			object_type = "module"
 
+		entry = ChangelogEntry(
+				module=_intern(module),
+				object_name=_intern(object_name),
+				body=body,
+				object_type=sys.intern(object_type),
+				)
+
 		changelog = self.env.changelog  # type: ignore
-		changelog[version][change_type].append((module, object_name, body, object_type))
+		changes = changelog.setdefault(version, {}).setdefault(sys.intern(change_type), {})
+		changes.setdefault(sys.intern(self.env.docname), []).append(entry)
+		self.env.changelog_outdated_versions.add(version)  # type: ignore
 
 	def run(self) -> List[Node]:
 		"""
@@ -112,96 +236,344 @@ class Change(VersionChange):
 		ret = super().run()
 
 		if self.name == "versionadded":
-			self.add_changelog_entry("add")
+			self.add_changelog_entry("add", ret[0])
 		elif self.name == "versionchanged":
-			self.add_changelog_entry("change")
-
-		changelog_node_purger.add_node(self.env, ret[0], ret[0], self.lineno)
+			self.add_changelog_entry("change", ret[0])
 
 		return ret
 
 
+def _iter_entries(entries: Dict[str, List[ChangelogEntry]]) -> Iterator[ChangelogEntry]:
+	# Yield the entries ordered by docname, so the output does not depend on the order the documents were read in.
+	for docname in sorted(entries):
+		yield from entries[docname]
+
+
+def _group_additions(
+		entries: Dict[str, List[ChangelogEntry]],
+		) -> Dict[str, Dict[Optional[str], List[ChangelogEntry]]]:
+	# Bucket the entries by object type and then by module in a single pass.
+	# Within each bucket the entries keep the order given by _iter_entries.
+	# Entries outside of any module or object (e.g. in prose pages) have nothing to list, and are skipped.
+	additions: Dict[str, Dict[Optional[str], List[ChangelogEntry]]] = {}
+
+	for entry in _iter_entries(entries):
+		if _entry_name(entry.module, entry.object_name) is None:
+			continue
+
+		additions.setdefault(entry.object_type, {}).setdefault(entry.module, []).append(entry)
+
+	return additions
+
+
+class changelog_node(nodes.General, nodes.Element):
+	"""
+	Placeholder for the changelog of a version.
+
+	The placeholder is replaced by :class:`~.ChangelogResolver` once all documents have been read.
+	"""
+
+
+class changelog_version_node(nodes.General, nodes.Element):
+	"""
+	Wrapper around the changelog of a version, which the LaTeX builder writes to a separate file.
+	"""
+
+
+# Recorded in ``env.changelog_pages`` for documents which display a range of versions.
+_all_versions = '*'
+
+
+def _version_key(version: str) -> Tuple[int, Any]:
+	try:
+		return (0, Version(version))
+	except InvalidVersion:
+		return (1, version)
+
+
 class Changelog(SphinxDirective):
 	"""
 	Directive which adds a changelog for the given version.
 
+	If no version is given a section is added for each version, newest first.
+	The ``:since:`` and ``:latest:`` options limit this to the versions since (and including) the given version,
+	or to the given number of most recent versions.
+
 	The changelog is compiled from :rst:dir:`versionadded` and :rst:dir:`versionchanged` directives.
 	"""
 
-	required_arguments = 1
+	optional_arguments = 1
+	option_spec = {"since": directives.unchanged_required, "latest": directives.positive_int}
 
-	def run(self):
+	def run(self) -> List[Node]:
 		"""
 		Process the content of the directive.
 		"""
 
+		changelog_pages = self.env.changelog_pages  # type: ignore
+
+		if self.arguments:
+			if self.options:
+				raise self.error(f"The {self.name!r} directive does not accept options when given a version.")
+
+			version = self.arguments[0]
+			node = changelog_node(version=version)
+			changelog_pages.setdefault(self.env.docname, set()).add(version)
+		else:
+			node = changelog_node(since=self.options.get("since"), latest=self.options.get("latest"))
+			changelog_pages.setdefault(self.env.docname, set()).add(_all_versions)
+
+			# Builders such as LaTeX resolve the placeholders with the docname of the master document.
+			node["in_changelog"] = is_changelog_document(self.env)
+
+		self.set_source_info(node)
+
+		return [node]
+
+
+def _entry_name(module: Optional[str], object_name: Optional[str]) -> Optional[str]:
+	# Returns the full name of the module or object the entry is for, or None if it isn't for one.
+	return '.'.join(filter(None, (module, object_name))) or None
+
+
+class ChangelogResolver(SphinxPostTransform):
+	"""
+	Replaces :class:`~.changelog_node` placeholders with the changelog for that version.
+
+	This runs after all documents have been read, so the changelog is complete
+	regardless of the order the documents were read in.
+	"""
+
+	# Before ReferencesResolver, so the cross-references in the changelog are resolved.
+	default_priority = 5
+
+	def run(self, **kwargs) -> None:
+		"""
+		Replace the changelog placeholders in the document.
+		"""
+
+		for node in self.document.traverse(changelog_node):
+			if node.get("version") is not None:
+				ret = self.render_changelog(node["version"])
+				in_changelog = isinstance(node.parent, nodes.section) and "changelog" in node.parent["classes"]
+			else:
+				ret = self.render_versions(node.get("since"), node.get("latest"))
+				in_changelog = node.get("in_changelog", False)
+
+			if in_changelog:
+				for section_node in ret:
+					for child_node in section_node.traverse(nodes.section):
+						child_node["classes"].append("changelog")
+
+			if node.get("version") is None or not self.latex_split:
+				node.replace_self(ret)
+				continue
+
+			parent = node.parent
+			if isinstance(parent, nodes.section) and len(parent.traverse(changelog_node)) == 1:
+				# Include the section's heading in the same file as its content.
+				node.replace_self(ret)
+				wrapper = changelog_version_node(version=node["version"])
+				parent.parent[parent.parent.index(parent)] = wrapper
+				wrapper += parent
+			else:
+				node.replace_self(changelog_version_node('', *ret, version=node["version"]))
+
+	@property
+	def latex_split(self) -> bool:
+		"""
+		Whether the changelog of each version should be written to a separate file by the LaTeX builder.
+		"""
+
+		return self.app.builder.name == "latex" and bool(self.config.changelog_latex_split)
+
+	def render_versions(self, since: Optional[str] = None, latest: Optional[int] = None) -> List[nodes.Element]:
+		"""
+		Create a section containing the changelog for each version in the given range, newest first.
+
+		If ``changelog_split_pages`` is set, a list of links to the pages for the versions is created instead.
+
+		:param since: Only include this version and newer versions.
+		:param latest: Only include this number of the most recent versions.
+		"""
+
+		versions = self.env.changelog_versions  # type: ignore
+
+		if since is not None:
+			since_key = _version_key(since)
+			versions = [version for version in versions if _version_key(version) >= since_key]
+
+		if latest is not None:
+			versions = versions[-latest:]
+
+		split_mode = _get_split_mode(self.app)
+		if split_mode:
+			return [self.render_index(versions, split_mode)]
+
+		ret = []
+
+		for version in reversed(versions):
+			section_node = nodes.section(changelog_generated="version")
+			section_node += nodes.title(version, version)
+			section_node["names"].append(fully_normalize_name(version))
+			self.document.note_implicit_target(section_node)
+			_set_version_id(self.document, section_node)
+			section_node.extend(self.render_changelog(version))
+
+			if self.latex_split:
+				ret.append(changelog_version_node('', section_node, version=version))
+			else:
+				ret.append(section_node)
+
+		return ret
+
+	def render_index(self, versions: List[str], split_mode: str) -> nodes.bullet_list:
+		"""
+		Create a list of links to the separate pages for the given versions, newest first.
+
+		:param versions:
+		:param split_mode: The value of the ``changelog_split_pages`` option.
+		"""
+
+		bullet_list = nodes.bullet_list(bullet='*')
+
+		for version in reversed(versions):
+			refuri = self.app.builder.get_relative_uri(self.env.docname, _split_page_name(version, split_mode))
+			if split_mode == "major" and _version_id(fully_normalize_name(version)):
+				refuri += f"#{fully_normalize_name(version)}"
+
+			reference = nodes.reference(version, version, internal=True, refuri=refuri)
+			bullet_list += nodes.list_item('', nodes.paragraph('', '', reference))
+
+		return bullet_list
+
+	def make_xref(self, module: Optional[str], object_name: Optional[str], obj_type: str) -> addnodes.pending_xref:
+		"""
+		Create a cross-reference to the given Python object.
+
+		The node is equivalent to the one created by the corresponding :rst:dir:`py` domain role.
+
+		:param module:
+		:param object_name:
+		:param obj_type:
+
+		At least one of ``module`` and ``object_name`` must be given.
+		"""
+
+		domain = self.env.get_domain("py")
+		obj_type_role = domain.object_types[obj_type].roles[0]
+
+		target = _entry_name(module, object_name)
+		if target is None:
+			raise ValueError("Either 'module' or 'object_name' must be given.")
+
+		if object_name:
+			role = obj_type_role or "obj"
+		else:
+			role = obj_type_role or "mod"
+
+		title = target
+
+		if getattr(domain.roles[role], "fix_parens", False) and self.config.add_function_parentheses:
+			title += "()"
+
+		refnode = addnodes.pending_xref(
+				title,
+				refdoc=self.env.docname,
+				refdomain="py",
+				reftype=role,
+				reftarget=target,
+				refexplicit=False,
+				refwarn=False,
+				)
+		refnode["py:module"] = None
+		refnode["py:class"] = None
+		refnode += nodes.literal(title, title, classes=["xref", "py", f"py-{role}"])
+
+		return refnode
+
+	def render_changelog(self, version: str) -> List[nodes.Element]:
+		"""
+		Create the nodes for the changelog of the given version.
+
+		:param version:
+		"""
+
 		ret = []
 
-		version = self.arguments[0]
 		changelog = self.env.changelog  # type: ignore
-		changes = changelog[version]
+		changes = changelog.get(version, {})
 
-		for module, object_name, body, obj_type in changes["change"]:
-			obj_type_role = self.env.get_domain("py").object_types[obj_type].roles[0]
+		# Changes outside of any module or object, e.g. in prose pages.
+		other_changes = []
 
-			if object_name:
-				full_module_name = f":py:{obj_type_role or 'obj'}:`{module}.{object_name}`"
-				sub_section_text = f"{module}.{object_name}"
-			else:
-				full_module_name = f":py:{obj_type_role or 'mod'}:`{module}`"
-				sub_section_text = module
+		for module, object_name, body, obj_type in _iter_entries(changes.get("change", {})):
+			sub_section_text = _entry_name(module, object_name)
 
-			sub_section_node = nodes.section()
-			sub_section_node += nodes.title()
-			ret.append(sub_section_node)
-			changelog_node_purger.add_node(self.env, sub_section_node, sub_section_node, self.lineno)
+			content_node = nodes.paragraph()
+			for body_node in body:
+				content_node += body_node.deepcopy()
+			for xref in content_node.traverse(addnodes.pending_xref):
+				xref["refdoc"] = self.env.docname
 
-			module_name_node = nodes.paragraph(full_module_name, full_module_name)
-			self.state.nested_parse(StringList([full_module_name]), self.content_offset, module_name_node)
-			sub_section_node.children[0] += module_name_node.children[1].children[0]  # type: ignore
+			if sub_section_text is None:
+				other_changes.append(content_node)
+				continue
+
+			sub_section_node = nodes.section(changelog_generated="entry")
+			sub_section_node += nodes.title('', '', self.make_xref(module, object_name, obj_type))
+			ret.append(sub_section_node)
 
 			name = fully_normalize_name(sub_section_text)
 			sub_section_node["names"].append(name)
-			self.state.document.note_implicit_target(sub_section_node, sub_section_node)
+			self.document.note_implicit_target(sub_section_node)
 
-			content_node = nodes.paragraph()
-			self.state.nested_parse(StringList(body), self.content_offset, content_node)
 			sub_section_node += content_node
 
-		if "add" in changes:
+		if other_changes:
+			sub_section_text = "Other changes"
+			sub_section_node = nodes.section(changelog_generated="entry")
+			sub_section_node += nodes.title(sub_section_text, sub_section_text)
+			ret.append(sub_section_node)
+			sub_section_node["names"].append(fully_normalize_name(sub_section_text))
+			self.document.note_implicit_target(sub_section_node)
+			sub_section_node.extend(other_changes)
+
+		additions = _group_additions(changes.get("add", {}))
+
+		if additions:
 			sub_section_text = "Additions"
-			sub_section_node = nodes.section()
+			sub_section_node = nodes.section(changelog_generated="entry")
 			sub_section_node += nodes.title(sub_section_text, sub_section_text)
 			ret.append(sub_section_node)
 			name = fully_normalize_name(sub_section_text)
 			sub_section_node["names"].append(name)
-			self.state.document.note_implicit_target(sub_section_node, sub_section_node)
-			changelog_node_purger.add_node(self.env, sub_section_node, sub_section_node, self.lineno)
+			self.document.note_implicit_target(sub_section_node)
 
-			content = stringlist.StringList()
 			content_node = nodes.paragraph()
 
-			additions = {k: list(v) for k, v in itertools.groupby(changes["add"], key=itemgetter(3))}
-
 			for group in sorted(additions):
 				group_name = group.capitalize()
-				if group_name == "class":
-					group_name = "classe"
-
-				content.append(f":bold-title:`{group_name}s`")
-				content.blankline()
-
-				for module, object_name, body, obj_type in additions[group]:
-					obj_type_role = self.env.get_domain("py").object_types[obj_type].roles[0]
-
-					if object_name:
-						content.append(f"* :py:{obj_type_role or 'obj'}:`{module}.{object_name}`")
-					else:
-						content.append(f"* :py:{obj_type_role or 'mod'}:`{module}`")
-
-				content.blankline()
+				if group == "class":
+					group_name = "Classe"
+
+				# Equivalent to the :bold-title: role from sphinx_toolbox.formatting
+				content_node += nodes.paragraph(
+						'',
+						'',
+						nodes.raw('', r"\vspace{10px}", format="latex"),
+						nodes.strong(f"**{group_name}s**", f"{group_name}s"),
+						)
+
+				bullet_list = nodes.bullet_list(bullet='*')
+				content_node += bullet_list
+
+				modules = additions[group]
+				for module in sorted(modules, key=lambda m: m or ''):
+					for entry in modules[module]:
+						xref = self.make_xref(entry.module, entry.object_name, entry.object_type)
+						bullet_list += nodes.list_item('', nodes.paragraph('', '', xref))
 
-			self.state.nested_parse(StringList(content), self.content_offset, content_node)
 			sub_section_node += content_node
 
 		return ret
@@ -242,78 +614,310 @@ def visit_title(translator: LaTeXTranslator, node: nodes.title) -> None:
 	return None
 
 
-_make_id = nodes.make_id
+def _latex_filename(version: str) -> str:
+	return "changelog-" + re.sub(r"[^A-Za-z0-9]+", '-', version).strip('-')
 
 
-def make_id(string):
-	if re.match(r"\d.\d.\d", string):
-		return string  # .replace(".", "-")
-	else:
-		return _make_id(string)
+def visit_changelog_version(translator: LaTeXTranslator, node: changelog_version_node) -> None:
+	translator.context.append(len(translator.body))
+
+
+def depart_changelog_version(translator: LaTeXTranslator, node: changelog_version_node) -> None:
+	"""
+	Move the LaTeX for the changelog of a version to a separate file, and include it with ``\\input`` or ``\\include``.
+
+	The file is only rewritten if its content changed.
+
+	:param translator:
+	:param node:
+	"""
+
+	start = translator.context.pop()
+	content = ''.join(translator.body[start:])
+	del translator.body[start:]
+
+	# Make the name unique in case the same version is shown more than once.
+	if not hasattr(translator, "_changelog_files"):
+		translator._changelog_files = set()  # type: ignore
+	written_files = translator._changelog_files  # type: ignore
+
+	base_name = name = _latex_filename(node["version"])
+	suffix = 1
+	while name in written_files:
+		suffix += 1
+		name = f"{base_name}-{suffix}"
+	written_files.add(name)
+
+	filename = PathPlus(translator.builder.outdir) / f"{name}.tex"
+	if not filename.is_file() or filename.read_text(encoding="UTF-8") != content:
+		filename.write_text(content, encoding="UTF-8")
+
+	translator.body.append(f"\n\\{translator.config.changelog_latex_split}{{{name}}}\n")
 
 
-nodes.make_id = make_id
+_version_id_re = re.compile(r"\d+\.\d+\.\d+")
+
+
+@functools.lru_cache(maxsize=1024)
+def _version_id(name: str) -> Optional[str]:
+	# Version numbers are used as-is for the ids of their sections, so the anchors are e.g. #1.2.3 rather than #id1.
+	if _version_id_re.match(name):
+		return name
+	return None
+
+
+def _set_version_id(document: nodes.document, section_node: nodes.section) -> None:
+	# Replace the id generated by docutils for a version section with the version number.
+	for name in section_node["names"]:
+		new_id = _version_id(name)
+		if new_id is None or new_id in document.ids:
+			continue
+
+		old_id = document.nameids.get(name)
+		if old_id not in section_node["ids"]:
+			continue
+
+		section_node["ids"][section_node["ids"].index(old_id)] = new_id
+		del document.ids[old_id]
+		document.ids[new_id] = section_node
+		document.nameids[name] = new_id
+		return
+
+
+@functools.lru_cache(maxsize=8)
+def _docname_matcher(patterns: Tuple[str, ...]) -> Matcher:
+	return Matcher(list(patterns))
+
+
+def is_changelog_document(env: BuildEnvironment) -> bool:
+	"""
+	Returns whether the current document is a changelog page,
+	as given by the ``changelog_docnames`` option.
+
+	:param env: The Sphinx build environment.
+	"""  # noqa: D400
+
+	return _docname_matcher(tuple(env.config.changelog_docnames))(env.docname)
 
 
 class ChangelogSectionTransform(SphinxTransform):
+	"""
+	Marks the sections for each version on changelog pages, and the sections within them,
+	with the ``changelog`` class.
+	"""
+
 	default_priority = 500
 
 	def apply(self, **kwargs) -> None:
+		"""
+		Apply the transform to the document.
+		"""
 
-		if self.env.docname != "changelog":
+		if not is_changelog_document(self.env):
 			return
 
-		for node in self.document.traverse(nodes.section):
-			if re.match(r"\d.\d.\d", node.children[0].astext()):  # type: ignore
-				node.attributes["classes"].append("changelog")
+		self.mark_sections(self.document, False)
 
-				for child_node in node.traverse(nodes.section):
-					child_node.attributes["classes"].append("changelog")
+	def mark_sections(self, node: nodes.Element, in_version: bool) -> None:
+		"""
+		Mark the sections within ``node``.
 
+		Each section is visited once, as only sections can contain other sections.
+
+		:param node:
+		:param in_version: Whether ``node`` is, or is within, the section for a version.
+		"""
+
+		for child_node in node.children:
+			if not isinstance(child_node, nodes.section):
+				continue
+
+			is_version = bool(
+					child_node.children and isinstance(child_node[0], nodes.title)
+					and _version_id_re.match(child_node[0].astext())
+					)
+
+			if is_version:
+				_set_version_id(self.document, child_node)
+
+			if is_version or in_version:
+				if "changelog" not in child_node["classes"]:
+					child_node["classes"].append("changelog")
+
+			self.mark_sections(child_node, is_version or in_version)
+
+
+_split_modes = {"version", "major"}
+
+
+def _get_split_mode(app: Sphinx) -> Optional[str]:
+	# The separate pages are only generated by the builders which write one file per document.
+	if app.builder.name not in {"html", "dirhtml"}:
+		return None
+
+	return app.config.changelog_split_pages or None
+
+
+def _major_version(version: str) -> str:
+	try:
+		return str(Version(version).major)
+	except InvalidVersion:
+		return version.split('.', 1)[0]
+
+
+def _split_page_name(version: str, split_mode: str) -> str:
+	if split_mode == "major":
+		return f"changelog/{_major_version(version)}.x"
+	else:
+		return f"changelog/{version}"
 
-# class Changelog(SphinxDirective):
-#
-# 	def run(self):
-#
-# 		ret = []
-#
-# 		for version, changes in self.env.changelog.items():
-# 			section_text = f"v{version}"
-# 			section_node = nodes.section()
-# 			section_node += nodes.title(section_text, section_text)
-# 			name = fully_normalize_name(section_text)
-# 			section_node['names'].append(name)
-# 			self.state.document.note_implicit_target(section_node, section_node)
-#
-# 			ret.append(section_node)
-##
-# 			for module, object_name, body in changes["change"]:
-# 				if object_name:
-# 					full_module_name = f":py:obj:`{module}.{object_name}`"
-# 					sub_section_text = f"{module}.{object_name}"
-# 				else:
-# 					full_module_name = f":py:mod:`{module}`"
-# 					sub_section_text = module
-#
-# 				sub_section_node = nodes.section()
-# 				sub_section_node += nodes.title()
-# 				section_node += sub_section_node
-#
-# 				module_name_node = nodes.paragraph(full_module_name, full_module_name)
-# 				self.state.nested_parse(StringList([full_module_name]), self.content_offset, module_name_node)
-# 				sub_section_node.children[0] += module_name_node.children[1].children[0]
-#
-# 				name = fully_normalize_name(sub_section_text)
-# 				sub_section_node['names'].append(name)
-# 				self.state.document.note_implicit_target(sub_section_node, sub_section_node)
-#
-# 				content_node = nodes.paragraph()
-# 				self.state.nested_parse(StringList(body), self.content_offset, content_node)
-# 				sub_section_node += content_node
-#
-# 			changelog_node_purger.add_node(self.env, section_node, section_node, self.lineno)
-#
-# 		return ret
+
+def _make_version_section(document: nodes.document, title: str, classes: List[str]) -> nodes.section:
+	section_node = nodes.section(classes=classes)
+	section_node += nodes.title(title, title)
+	section_node["names"].append(fully_normalize_name(title))
+	document.note_implicit_target(section_node)
+	_set_version_id(document, section_node)
+	return section_node
+
+
+def render_changelog_page(app: Sphinx, pagename: str, title: str, versions: List[str], split_mode: str) -> str:
+	"""
+	Render the HTML body of a separate changelog page for the given versions.
+
+	The changelog is created and its cross-references resolved by the post-transforms,
+	in the same way as for a :rst:dir:`changelog` directive in a document.
+
+	:param app: The Sphinx application.
+	:param pagename: The name of the page.
+	:param title: The title of the page.
+	:param versions: The versions to show on the page, newest first.
+	:param split_mode: The value of the ``changelog_split_pages`` option.
+	"""
+
+	document = new_document(f"<{pagename}>")
+	document.settings.env = app.env
+
+	if split_mode == "version":
+		page_section = _make_version_section(document, title, ["changelog"])
+		page_section += changelog_node(version=title)
+	else:
+		page_section = _make_version_section(document, title, [])
+		for version in versions:
+			version_section = _make_version_section(document, version, ["changelog"])
+			version_section += changelog_node(version=version)
+			page_section += version_section
+
+	document += page_section
+
+	# Equivalent to env.apply_post_transforms, without emitting doctree-resolved for a document that does not exist.
+	backup = copy.copy(app.env.temp_data)
+	try:
+		app.env.temp_data["docname"] = pagename
+		transformer = SphinxTransformer(document)
+		transformer.set_environment(app.env)
+		transformer.add_transforms(app.registry.get_post_transforms())
+		transformer.apply_transforms()
+	finally:
+		app.env.temp_data = backup
+
+	# Equivalent to StandaloneHTMLBuilder.write_doc
+	builder = app.builder
+	destination = StringOutput(encoding="UTF-8")
+	document.settings = builder.docsettings  # type: ignore
+	builder.secnumbers = {}  # type: ignore
+	builder.fignumbers = {}  # type: ignore
+	builder.imgpath = relative_uri(builder.get_target_uri(pagename), "_images")  # type: ignore
+	builder.dlpath = relative_uri(builder.get_target_uri(pagename), "_downloads")  # type: ignore
+	builder.current_docname = pagename  # type: ignore
+	builder.docwriter.write(document, destination)  # type: ignore
+	builder.docwriter.assemble_parts()  # type: ignore
+
+	return builder.docwriter.parts["fragment"]  # type: ignore
+
+
+def collect_changelog_pages(app: Sphinx) -> Iterator[Tuple[str, Dict[str, Any], str]]:
+	"""
+	Generate the separate changelog pages when the ``changelog_split_pages`` option is set.
+
+	Only the pages showing a version whose entries changed since the previous build,
+	and pages which do not exist in the output directory, are written.
+
+	:param app: The Sphinx application.
+	"""
+
+	split_mode = _get_split_mode(app)
+	if not split_mode:
+		return
+
+	pages: Dict[str, List[str]] = {}
+	for version in reversed(app.env.changelog_versions):  # type: ignore
+		pages.setdefault(_split_page_name(version, split_mode), []).append(version)
+
+	changed_versions = app.env.changelog_changed_versions  # type: ignore
+
+	for pagename, versions in pages.items():
+		if changed_versions.isdisjoint(versions) and os.path.isfile(app.builder.get_outfilename(pagename)):
+			continue
+
+		if split_mode == "major":
+			title = f"{_major_version(versions[0])}.x"
+		else:
+			title = versions[0]
+
+		context = {"title": title, "body": render_changelog_page(app, pagename, title, versions, split_mode)}
+		yield pagename, context, "page.html"
+
+
+def _find_excluded_sections(node: nodes.Element, excluded: Set[str]) -> Iterator[nodes.Element]:
+	# Yields the outermost generated sections of the given kinds, without descending into them.
+	for child_node in node.children:
+		if not isinstance(child_node, nodes.Element):
+			continue
+
+		if child_node.get("changelog_generated") in excluded:
+			yield child_node
+		else:
+			yield from _find_excluded_sections(child_node, excluded)
+
+
+def exclude_changelog_from_search(app: Sphinx) -> None:
+	"""
+	Exclude the sections generated by :rst:dir:`changelog` directives from the HTML search index,
+	as determined by the ``changelog_search_index`` option.
+
+	The option can be ``'all'`` (the default) to index everything,
+	``'headings'`` to only index the headings of the versions, or ``'none'`` to exclude the changelog entirely.
+
+	:param app: The Sphinx application.
+	"""  # noqa: D400
+
+	search_index = app.config.changelog_search_index
+
+	if search_index == "all" or not hasattr(app.builder, "index_page"):
+		return
+
+	excluded = {"entry"} if search_index == "headings" else {"entry", "version"}
+	index_page = app.builder.index_page  # type: ignore
+
+	def wrapper(pagename: str, doctree: nodes.document, title: str) -> None:
+		if pagename not in app.env.changelog_pages:  # type: ignore
+			return index_page(pagename, doctree, title)
+
+		# The doctree is written after being indexed, so the sections are only removed temporarily.
+		removed = []
+		for node in list(_find_excluded_sections(doctree, excluded)):
+			parent = node.parent
+			removed.append((parent, parent.index(node), node))
+			parent.remove(node)
+
+		try:
+			return index_page(pagename, doctree, title)
+		finally:
+			for parent, index, node in reversed(removed):
+				parent.insert(index, node)
+
+	app.builder.index_page = wrapper  # type: ignore
 
 
 def builder_init(app: Sphinx) -> None:
@@ -321,15 +925,280 @@ def builder_init(app: Sphinx) -> None:
 	Initialize the changelog dictionary.
 
 	``env.changelog`` is a dictionary mapping version numbers to a mapping
-	of change types (add, change) to a list of changes.
+	of change types (add, change) to a mapping of docnames to a list of changes.
 
-	Each change is a tuple of ``(module, object_name, directive_body, object_type)``
+	Each change is a :class:`~.ChangelogEntry`.
+
+	The dictionary is stored in the pickled environment, so entries from unchanged documents
+	are kept between incremental builds.
+
+	``env.changelog_pages`` maps the names of documents containing :rst:dir:`changelog` directives
+	to the versions they display, and ``env.changelog_hashes`` maps version numbers to a hash of their entries.
+	``env.changelog_versions`` is a list of the version numbers, sorted from oldest to newest.
 
 	:param app: The Sphinx application.
 	"""
 
-	changelog: _ChangelogType = defaultdict(partial(defaultdict, list))  # type: ignore
+	if hasattr(app.env, "changelog"):
+		return
+
+	changelog: _ChangelogType = {}
 	app.env.changelog = changelog  # type: ignore
+	app.env.changelog_pages = {}  # type: ignore
+	app.env.changelog_hashes = {}  # type: ignore
+	app.env.changelog_versions = []  # type: ignore
+	app.env.changelog_outdated_versions = set()  # type: ignore
+	app.env.changelog_changed_versions = set()  # type: ignore
+
+
+def purge_changelog(app: Sphinx, env: BuildEnvironment, docname: str) -> None:
+	"""
+	Remove the changelog entries recorded from the given document.
+
+	:param app: The Sphinx application.
+	:param env: The Sphinx build environment.
+	:param docname: The name of the document to remove entries for.
+	"""
+
+	if not hasattr(env, "changelog"):
+		return
+
+	changelog = env.changelog  # type: ignore
+
+	for version in list(changelog):
+		changes = changelog[version]
+
+		for change_type in list(changes):
+			if changes[change_type].pop(docname, None) is not None:
+				env.changelog_outdated_versions.add(version)  # type: ignore
+			if not changes[change_type]:
+				del changes[change_type]
+
+		if not changes:
+			del changelog[version]
+
+	env.changelog_pages.pop(docname, None)  # type: ignore
+
+
+def merge_changelog(
+		app: Sphinx,
+		env: BuildEnvironment,
+		docnames: Set[str],
+		other: BuildEnvironment,
+		) -> None:
+	"""
+	Merge the changelog entries recorded by a parallel read worker into the main environment.
+
+	:param app: The Sphinx application.
+	:param env: The main Sphinx build environment.
+	:param docnames: The names of the documents read by the worker.
+	:param other: The worker's build environment.
+	"""
+
+	changelog = env.changelog  # type: ignore
+
+	for version, changes in other.changelog.items():  # type: ignore
+		for change_type, entries in changes.items():
+			for docname, doc_entries in entries.items():
+				if docname in docnames:
+					changelog.setdefault(version, {}).setdefault(change_type, {})[docname] = doc_entries
+					env.changelog_outdated_versions.add(version)  # type: ignore
+
+	for docname, versions in other.changelog_pages.items():  # type: ignore
+		if docname in docnames:
+			env.changelog_pages[docname] = versions  # type: ignore
+
+
+def _hash_entries(changes: Dict[str, Dict[str, List[ChangelogEntry]]]) -> str:
+	sha = hashlib.sha1()
+
+	for change_type in sorted(changes):
+		sha.update(change_type.encode("UTF-8"))
+
+		for module, object_name, body, object_type in _iter_entries(changes[change_type]):
+			for value in (module, object_name, object_type, ''.join(map(str, body))):
+				sha.update(str(value).encode("UTF-8"))
+				sha.update(b"\0")
+
+	return sha.hexdigest()
+
+
+def get_updated_changelogs(app: Sphinx, env: BuildEnvironment) -> List[str]:
+	"""
+	Returns the names of documents whose changelogs must be rewritten because their entries changed.
+
+	A hash of the entries of each version is kept in ``env.changelog_hashes``.
+	Only the documents showing a version whose hash differs from the previous build are returned.
+
+	The changelogs are filled in when the documents are written, so they do not need to be read again.
+
+	:param app: The Sphinx application.
+	:param env: The Sphinx build environment.
+	"""
+
+	changelog = env.changelog  # type: ignore
+	changelog_hashes = env.changelog_hashes  # type: ignore
+	changed_versions = set()
+
+	if env.changelog_outdated_versions:  # type: ignore
+		env.changelog_versions = sorted(changelog, key=_version_key)  # type: ignore
+
+	for version in env.changelog_outdated_versions:  # type: ignore
+		if version in changelog:
+			new_hash = _hash_entries(changelog[version])
+		else:
+			new_hash = None
+
+		if changelog_hashes.get(version) != new_hash:
+			changed_versions.add(version)
+
+		if new_hash is None:
+			changelog_hashes.pop(version, None)
+		else:
+			changelog_hashes[version] = new_hash
+
+	env.changelog_outdated_versions = set()  # type: ignore
+	env.changelog_changed_versions = set(changed_versions)  # type: ignore
+
+	if changed_versions:
+		changed_versions.add(_all_versions)
+
+	return [docname for docname, versions in env.changelog_pages.items() if versions & changed_versions]  # type: ignore
+
+
+def _sizeof(obj: object, seen: Set[int]) -> int:
+	if id(obj) in seen:
+		return 0
+
+	seen.add(id(obj))
+	size = sys.getsizeof(obj)
+
+	if isinstance(obj, dict):
+		size += sum(_sizeof(key, seen) + _sizeof(value, seen) for key, value in obj.items())
+	elif isinstance(obj, (list, tuple, set)):
+		size += sum(_sizeof(item, seen) for item in obj)
+	elif isinstance(obj, Node):
+		size += sum(_sizeof(value, seen) for key, value in vars(obj).items() if key not in {"parent", "document"})
+
+	return size
+
+
+def get_changelog_size(changelog: _ChangelogType) -> Dict[str, int]:
+	"""
+	Returns statistics about the size of the changelog.
+
+	The returned dictionary contains the number of ``versions`` and ``entries``,
+	the approximate size of the changelog in memory (``memory``, in bytes),
+	and the size of the changelog when pickled into the environment (``pickle``, in bytes).
+
+	:param changelog: The changelog dictionary from the build environment.
+	"""
+
+	return {
+			"versions": len(changelog),
+			"entries": sum(
+					len(doc_entries)
+					for changes in changelog.values()
+					for entries in changes.values()
+					for doc_entries in entries.values()
+					),
+			"memory": _sizeof(changelog, set()),
+			"pickle": len(pickle.dumps(changelog, pickle.HIGHEST_PROTOCOL)),
+			}
+
+
+def report_changelog_size(app: Sphinx, env: BuildEnvironment) -> None:
+	"""
+	Log the size of the changelog when Sphinx is run in verbose mode.
+
+	:param app: The Sphinx application.
+	:param env: The Sphinx build environment.
+	"""
+
+	if not app.verbosity:
+		return
+
+	size = get_changelog_size(env.changelog)  # type: ignore
+	logger.verbose(
+			"changelog: %d entries for %d versions, approximately %d bytes in memory, %d bytes pickled",
+			size["entries"],
+			size["versions"],
+			size["memory"],
+			size["pickle"],
+			)
+
+
+def iter_changelog_records(env: BuildEnvironment) -> Iterator[Dict[str, Optional[str]]]:
+	"""
+	Iterate over the entries in the changelog as flat records.
+
+	Each record is a dictionary with the keys ``version``, ``change_type``, ``module``,
+	``object``, ``object_type`` and ``docname``. The versions are given from oldest to newest.
+
+	:param env: The Sphinx build environment.
+	"""
+
+	return _iter_records(env.changelog, env.changelog_versions)  # type: ignore
+
+
+def _iter_records(changelog: _ChangelogType, versions: List[str]) -> Iterator[Dict[str, Optional[str]]]:
+	for version in versions:
+		changes = changelog[version]
+
+		for change_type in sorted(changes):
+			entries = changes[change_type]
+
+			for docname in sorted(entries):
+				for entry in entries[docname]:
+					yield {
+							"version": version,
+							"change_type": change_type,
+							"module": entry.module,
+							"object": entry.object_name,
+							"object_type": entry.object_type,
+							"docname": docname,
+							}
+
+
+def write_changelog_ndjson(app: Sphinx, exception: Optional[Exception] = None) -> None:
+	"""
+	Write the changelog to the file given by the ``changelog_ndjson`` option, one JSON record per line.
+
+	The records are those given by :func:`~.iter_changelog_records`.
+	The file is only rewritten when its contents would change,
+	so tools watching it are not triggered by builds which did not touch the changelog.
+
+	:param app: The Sphinx application.
+	:param exception: Any exception which occurred and caused Sphinx to abort.
+	"""
+
+	if exception:  # pragma: no cover
+		return
+
+	if not app.config.changelog_ndjson:
+		return
+
+	filename = PathPlus(app.outdir) / app.config.changelog_ndjson
+
+	def iter_lines() -> Iterator[str]:
+		for record in iter_changelog_records(app.env):
+			yield json.dumps(record) + '\n'
+
+	if filename.is_file():
+		new_hash = hashlib.sha1()
+		for line in iter_lines():
+			new_hash.update(line.encode("UTF-8"))
+
+		if hashlib.sha1(filename.read_bytes()).digest() == new_hash.digest():
+			return
+
+	filename.parent.maybe_make(parents=True)
+	tmp_filename = filename.with_name(filename.name + ".tmp")
+
+	with tmp_filename.open('w', encoding="UTF-8", newline='\n') as fp:
+		fp.writelines(iter_lines())
+
+	os.replace(tmp_filename, filename)
 
 
 def setup(app: Sphinx) -> Dict[str, Any]:
@@ -340,14 +1209,392 @@ def setup(app: Sphinx) -> Dict[str, Any]:
 	"""
 
 	app.connect("builder-inited", builder_init)
-	app.connect("env-get-outdated", changelog_node_purger.get_outdated_docnames)
+	app.connect("builder-inited", exclude_changelog_from_search)
+	app.connect("env-purge-doc", purge_changelog)
+	app.connect("env-merge-info", merge_changelog)
+	app.connect("env-updated", get_updated_changelogs)
+	app.connect("env-updated", report_changelog_size)
+	app.connect("html-collect-pages", collect_changelog_pages)
+	app.connect("build-finished", write_changelog_ndjson)
 
 	app.add_directive("versionadded", Change, override=True)
 	app.add_directive("versionchanged", Change, override=True)
 	app.add_directive("changelog", Changelog)
 
 	app.add_transform(ChangelogSectionTransform)
+	app.add_post_transform(ChangelogResolver)
 	app.add_node(nodes.title, latex=(visit_title, LaTeXTranslator.depart_title), override=True)
+	app.add_node(changelog_version_node, latex=(visit_changelog_version, depart_changelog_version))
 	app.add_config_value("changelog_sections_numbered", True, "env", [bool])
+	app.add_config_value("changelog_ndjson", None, '', [str])
+	app.add_config_value("changelog_docnames", ["changelog"], "env", [list])
+	app.add_config_value("changelog_search_index", "all", "html", ENUM("all", "headings", "none"))
+	app.add_config_value("changelog_latex_split", None, '', ENUM(None, "input", "include"))
+	app.add_config_value(
+			"changelog_split_pages",
+			None,
+			"env",
+			ENUM(None, *sorted(_split_modes)),
+			)
+
+	return {"parallel_read_safe": True, "env_version": 7}
+
+
+# Scanning sources without a Sphinx build.
+
+_directive_re = re.compile(r"^(\s*)\.\.\s+(?:py:)?([\w-]+)::\s*(.*?)\s*$")
+_object_name_re = re.compile(r"^[\w.]+")
+
+# Maps directives (with any ``py:`` prefix removed) to the object types recorded by Sphinx.
+_object_directives = {
+		"function": "function",
+		"data": "data",
+		"class": "class",
+		"exception": "exception",
+		"method": "method",
+		"classmethod": "method",
+		"staticmethod": "method",
+		"attribute": "attribute",
+		"decorator": "function",
+		"decoratormethod": "method",
+		"autofunction": "function",
+		"autodata": "data",
+		"autoclass": "class",
+		"autoexception": "exception",
+		"automethod": "method",
+		"autoattribute": "attribute",
+		"autodecorator": "function",
+		}
+
+_module_directives = {"module", "currentmodule", "automodule"}
+_version_directives = {"versionadded": "add", "versionchanged": "change"}
+
+# Directives whose content is not reStructuredText, so isn't scanned.
+_literal_directives = {"code", "code-block", "sourcecode", "literalinclude", "parsed-literal", "raw"}
+
+
+class _Scope(NamedTuple):
+	indent: int
+	object_name: str
+	object_type: str
+
+
+def _indent_of(line: str) -> int:
+	return len(line) - len(line.lstrip())
+
+
+def scan_lines(
+		lines: Iterable[str],
+		module: Optional[str] = None,
+		object_name: Optional[str] = None,
+		object_type: str = "module",
+		) -> Iterator[Tuple[str, str, ChangelogEntry]]:
+	"""
+	Scan reStructuredText for :rst:dir:`versionadded` and :rst:dir:`versionchanged` directives,
+	without parsing it.
+
+	The module and object each directive belongs to are determined from the Python domain
+	directives (and their :mod:`sphinx.ext.autodoc` equivalents) it is nested within.
+
+	Yields tuples of the version, the type of change (add / change) and the :class:`~.ChangelogEntry`.
+	The body of a :rst:dir:`versionchanged` directive is given as a single paragraph of its source text.
+
+	:param lines: The lines of reStructuredText.
+	:param module: The module the text belongs to.
+	:param object_name: The name of the object the text belongs to.
+	:param object_type: The type of the object the text belongs to.
+	"""  # noqa: D400
+
+	scopes: List[_Scope] = []
+	version: Optional[Tuple[int, str, str, List[str]]] = None
+
+	# The indentation of the line introducing a literal block or comment, whose content is skipped.
+	literal_indent: Optional[int] = None
+
+	def make_entry() -> Tuple[str, str, ChangelogEntry]:
+		assert version is not None
+		_, change_type, version_number, body_lines = version
+
+		if scopes:
+			scope_name: Optional[str] = scopes[-1].object_name
+			scope_type = scopes[-1].object_type
+		else:
+			scope_name, scope_type = object_name, object_type
+
+		body: Tuple[Node, ...] = ()
+		text = '\n'.join(body_lines).strip()
+		if change_type == "change" and text:
+			body = (nodes.paragraph(text, text), )
+
+		entry = ChangelogEntry(
+				module=_intern(module),
+				object_name=_intern(scope_name),
+				body=body,
+				object_type=sys.intern(scope_type),
+				)
+
+		return sys.intern(version_number), sys.intern(change_type), entry
+
+	for line in lines:
+		line = line.rstrip()
+
+		if not line:
+			if version is not None:
+				version[3].append('')
+			continue
+
+		indent = _indent_of(line)
+
+		if version is not None:
+			if indent > version[0]:
+				version[3].append(line[version[0]:].strip())
+				continue
+
+			yield make_entry()
+			version = None
+
+		if literal_indent is not None:
+			if indent > literal_indent:
+				continue
+			literal_indent = None
+
+		while scopes and indent <= scopes[-1].indent:
+			scopes.pop()
+
+		m = _directive_re.match(line)
+		if not m:
+			if line.lstrip().startswith("..") or line.endswith("::"):
+				# A comment (or other explicit markup), or a paragraph followed by a literal block.
+				literal_indent = indent
+			continue
+
+		directive_indent, name, argument = len(m.group(1)), m.group(2), m.group(3)
+
+		if name in _literal_directives:
+			literal_indent = directive_indent
+
+		elif name in _version_directives:
+			if not argument:
+				continue
+
+			version_number, *text = argument.split(maxsplit=1)
+			version = (directive_indent, _version_directives[name], version_number, text)
+
+		elif name in _module_directives:
+			if argument:
+				module = argument
+			scopes.clear()
+
+		elif name in _object_directives:
+			object_match = _object_name_re.match(argument)
+			if not object_match:
+				continue
+
+			name_in_scope = object_match.group(0)
+			if scopes:
+				name_in_scope = f"{scopes[-1].object_name}.{name_in_scope}"
+
+			scopes.append(_Scope(directive_indent, name_in_scope, _object_directives[name]))
+
+	if version is not None:
+		yield make_entry()
+
+
+def _iter_docstrings(
+		tree: ast.AST,
+		prefix: str = '',
+		in_class: bool = False,
+		) -> Iterator[Tuple[Optional[str], str, str]]:
+	# Yields the name, type and docstring of the module, and of the public classes and functions within it.
+	if isinstance(tree, ast.Module):
+		docstring = ast.get_docstring(tree)
+		if docstring:
+			yield None, "module", docstring
+
+	for node in getattr(tree, "body", ()):
+		if not isinstance(node, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+			continue
+		if node.name.startswith('_'):
+			continue
+
+		name = f"{prefix}{node.name}"
+
+		if isinstance(node, ast.ClassDef):
+			object_type = "class"
+		elif in_class:
+			object_type = "method"
+		else:
+			object_type = "function"
+
+		docstring = ast.get_docstring(node)
+		if docstring:
+			yield name, object_type, docstring
+
+		if isinstance(node, ast.ClassDef):
+			yield from _iter_docstrings(node, prefix=f"{name}.", in_class=True)
+
+
+def scan_file(filename: str, docname: str) -> Tuple[str, List[Tuple[str, str, ChangelogEntry]]]:
+	"""
+	Scan a reStructuredText file, or the docstrings in a Python file, for changelog entries.
+
+	For Python files ``docname`` is used as the name of the module.
+
+	Returns the docname and a list of the entries found, as given by :func:`~.scan_lines`.
+
+	:param filename: The file to scan.
+	:param docname: The document name of the file.
+
+	:raises SyntaxError: If a Python file cannot be parsed.
+	:raises UnicodeDecodeError: If a reStructuredText file is not valid UTF-8.
+	"""
+
+	if not filename.endswith(".py"):
+		with open(filename, encoding="UTF-8") as fp:
+			return docname, list(scan_lines(fp))
+
+	with open(filename, 'rb') as fp:
+		source = fp.read()
+
+	tree = ast.parse(source, filename)
+	found = []
+
+	for object_name, object_type, docstring in _iter_docstrings(tree):
+		found.extend(scan_lines(docstring.splitlines(), docname, object_name, object_type))
+
+	return docname, found
+
+
+def _iter_source_files(root: str) -> Iterator[Tuple[str, str]]:
+	# Yields the filenames of the .rst and .py files within root, and their docnames.
+	if os.path.isfile(root):
+		yield root, os.path.splitext(os.path.basename(root))[0]
+		return
+
+	for dirpath, dirnames, filenames in os.walk(root):
+		dirnames[:] = sorted(d for d in dirnames if not d.startswith('.') and d != "__pycache__")
+
+		for filename in sorted(filenames):
+			stem, suffix = os.path.splitext(filename)
+			relative_path = os.path.relpath(os.path.join(dirpath, stem), root)
+
+			if suffix == ".rst":
+				yield os.path.join(dirpath, filename), relative_path.replace(os.sep, '/')
+			elif suffix == ".py":
+				module = relative_path.replace(os.sep, '.')
+				if module.endswith(".__init__"):
+					module = module[:-len(".__init__")]
+				yield os.path.join(dirpath, filename), module
+
+
+def _scan_file_star(
+		args: Tuple[str, str],
+		) -> Tuple[str, List[Tuple[str, str, ChangelogEntry]], Optional[Exception]]:
+	# Returns the error rather than raising it, so one bad file doesn't abort the other workers.
+	# UnicodeDecodeError (and the error for null bytes in Python files) are ValueErrors.
+	try:
+		return (*scan_file(*args), None)
+	except (SyntaxError, ValueError) as e:
+		return args[1], [], e
+
+
+def scan_changelog(
+		paths: Iterable[str],
+		jobs: int = 1,
+		errors: Optional[List[Tuple[str, Exception]]] = None,
+		) -> _ChangelogType:
+	"""
+	Build a changelog, in the same form as ``env.changelog``, by scanning the given files and directories.
+
+	Directories are searched for ``.rst`` files and for ``.py`` files, whose docstrings are scanned.
+	The docnames of ``.rst`` files are their paths relative to the given directory, without the suffix,
+	and the docnames of ``.py`` files are their module names.
+
+	Files which cannot be decoded, and Python files which cannot be parsed, are skipped.
+
+	:param paths:
+	:param jobs: The number of processes to scan the files with.
+	:param errors: If given, the filename and error of each skipped file are appended to this list.
+	"""
+
+	files = [source for path in paths for source in _iter_source_files(path)]
+	changelog: _ChangelogType = {}
+
+	if jobs > 1 and len(files) > 1:
+		with multiprocessing.Pool(min(jobs, len(files))) as pool:
+			results = pool.map(_scan_file_star, files, chunksize=max(1, len(files) // (jobs * 4)))
+	else:
+		results = list(map(_scan_file_star, files))
+
+	for (filename, _), (docname, found, error) in zip(files, results):
+		if error is not None and errors is not None:
+			errors.append((filename, error))
+
+		for version, change_type, entry in found:
+			changelog.setdefault(version, {}).setdefault(change_type, {}).setdefault(docname, []).append(entry)
+
+	return changelog
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+	"""
+	Scan sources for changelog entries and write them to stdout as JSON.
+
+	:param argv: The command line arguments. Defaults to :py:obj:`sys.argv`.
+	"""
+
+	parser = argparse.ArgumentParser(
+			prog="python -m sphinx_toolbox_experimental.changelog",
+			description="Extract the changelog from versionadded and versionchanged directives "
+			"in reStructuredText files and Python docstrings, without building the documentation.",
+			)
+	parser.add_argument("paths", nargs='+', help="The files and directories to scan.")
+	parser.add_argument(
+			"-j",
+			"--jobs",
+			type=int,
+			default=os.cpu_count() or 1,
+			help="The number of processes to use. Defaults to the number of CPUs.",
+			)
+	parser.add_argument(
+			"--ndjson",
+			action="store_true",
+			help="Write one record per line, in the same format as the changelog_ndjson option.",
+			)
+	args = parser.parse_args(argv)
+
+	errors: List[Tuple[str, Exception]] = []
+	changelog = scan_changelog(args.paths, jobs=args.jobs, errors=errors)
+
+	for filename, error in errors:
+		print(f"Skipping {filename}: {error}", file=sys.stderr)
+	versions = sorted(changelog, key=_version_key)
+
+	if args.ndjson:
+		for record in _iter_records(changelog, versions):
+			sys.stdout.write(json.dumps(record) + '\n')
+		return 0
+
+	output: Dict[str, Dict[str, Dict[str, List[Dict[str, Optional[str]]]]]] = {}
+
+	for version in versions:
+		changes = changelog[version]
+
+		for change_type in sorted(changes):
+			entries = changes[change_type]
+
+			for docname in sorted(entries):
+				output.setdefault(version, {}).setdefault(change_type, {})[docname] = [{
+						"module": entry.module,
+						"object_name": entry.object_name,
+						"body": "\n\n".join(node.astext() for node in entry.body),
+						"object_type": entry.object_type,
+						} for entry in entries[docname]]
+
+	json.dump(output, sys.stdout, indent=2)
+	sys.stdout.write('\n')
+	return 0
+
 
-	return {"parallel_read_safe": True}
+if __name__ == "__main__":
+	sys.exit(main())
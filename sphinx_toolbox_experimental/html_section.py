@@ -55,3 +55,5 @@ def setup(app: Sphinx):
 			)
 
 	app.setup_extension("html_section")
+
+	return {"parallel_read_safe": True, "parallel_write_safe": True}
@@ -32,15 +32,306 @@ Sphinx extension which ignores warnings about certain XRefs being unresolved.
 #
 
 # stdlib
+import json
 import re
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Pattern, Tuple
 
 # 3rd party
 from docutils import nodes
+from domdf_python_tools.paths import PathPlus
+from sphinx import addnodes
 from sphinx.application import Sphinx
+from sphinx.config import Config
 from sphinx.environment import BuildEnvironment
-from sphinx.errors import NoUri
+from sphinx.errors import ConfigError, NoUri
 
-__all__ = ["handle_missing_xref", "setup"]
+__all__ = [
+		"MissingXrefMatcher",
+		"compile_patterns",
+		"handle_missing_xref",
+		"load_counts",
+		"purge_counts",
+		"setup",
+		"update_counts",
+		"write_report",
+		]
+
+# Marks the end of a prefix in the trie. No single character can be equal to it.
+_END = ''
+
+
+_numbered_backreference = re.compile(r"\\\d|\(\?\(\d")
+_default_flags = re.compile('').flags
+
+
+def _compile_regexes(patterns: List[str]) -> Callable[[str], Optional[str]]:
+	# Returns a function which gives the first of the patterns matching the target, or None.
+	if not patterns:
+		return lambda target: None
+
+	compiled: List[Pattern] = [re.compile(pattern) for pattern in patterns]
+
+	def match_any(target: str) -> Optional[str]:
+		for pattern in compiled:
+			if pattern.match(target):
+				return pattern.pattern
+		return None
+
+	if any(pattern.flags != _default_flags for pattern in compiled):
+		# Global inline flags (e.g. ``(?i)``) would apply to every pattern in the combined expression
+		# (or be an error on Python 3.11 and newer) rather than just to their own pattern.
+		return match_any
+
+	if any(_numbered_backreference.search(pattern) for pattern in patterns):
+		# Wrapping the patterns in groups would change what the backreferences refer to.
+		return match_any
+
+	try:
+		# The name of the outermost group which matched identifies the pattern.
+		combined = re.compile('|'.join(f"(?P<_pattern{idx}>{pattern})" for idx, pattern in enumerate(patterns)))
+	except re.error:
+		# e.g. group names used by more than one pattern.
+		return match_any
+
+	def match_combined(target: str) -> Optional[str]:
+		m = combined.match(target)
+		if m is None:
+			return None
+		return patterns[int(m.lastgroup[len("_pattern"):])]  # type: ignore
+
+	return match_combined
+
+
+class _RuleSet:
+	# The exact names, prefixes and regular expressions which apply to one domain and reference type.
+
+	def __init__(self, name: str):
+		self.name = name
+		self.exact: Dict[str, str] = {}
+		self.prefixes: Dict[str, Any] = {}
+		self.regexes: List[str] = []
+		self.match_regex: Callable[[str], Optional[str]] = _compile_regexes(self.regexes)
+
+	def add_exact(self, target: str) -> None:
+		self.exact[target] = f"{self.name} exact {target}"
+
+	def add_prefix(self, prefix: str) -> None:
+		trie = self.prefixes
+		for char in prefix:
+			trie = trie.setdefault(char, {})
+		trie[_END] = f"{self.name} prefix {prefix}"
+
+	def add_regex(self, pattern: str) -> None:
+		self.regexes.append(pattern)
+
+	def labels(self) -> Iterator[str]:
+		yield from self.exact.values()
+
+		tries = [self.prefixes]
+		while tries:
+			trie = tries.pop()
+			for char, child in trie.items():
+				if char == _END:
+					yield child
+				else:
+					tries.append(child)
+
+		for pattern in self.regexes:
+			yield f"{self.name} regex {pattern}"
+
+	def match_prefix(self, target: str) -> Optional[str]:
+		trie = self.prefixes
+		if _END in trie:
+			return trie[_END]
+
+		for char in target:
+			trie = trie.get(char)  # type: ignore
+			if trie is None:
+				return None
+			if _END in trie:
+				return trie[_END]
+
+		return None
+
+	def match(self, target: str) -> Optional[str]:
+		# Returns a label for the rule which matched the target, or None.
+		if target in self.exact:
+			return self.exact[target]
+
+		label = self.match_prefix(target)
+		if label is not None:
+			return label
+
+		pattern = self.match_regex(target)
+		if pattern is not None:
+			return f"{self.name} regex {pattern}"
+
+		return None
+
+
+_rule_keys = {"domain", "type", "exact", "prefix", "regex"}
+
+
+class MissingXrefMatcher:
+	"""
+	Determines whether the warning for an unresolved cross reference should be ignored.
+
+	The patterns are compiled once, into a single regular expression where possible,
+	and the result for each target is cached.
+
+	Each rule is a mapping which may contain the following keys:
+
+	* ``domain`` -- the domain of the reference, e.g. ``'py'``. If omitted the rule applies to all domains.
+	* ``type`` -- the type of the reference, e.g. ``'class'``. If omitted the rule applies to all types.
+	* ``exact`` -- a list of targets to ignore.
+	* ``prefix`` -- a list of prefixes. Targets starting with any of them are ignored.
+	* ``regex`` -- a list of regular expressions which are matched (with :func:`re.match`) against the target.
+
+	Exact names are looked up in a set and prefixes in a trie,
+	so only rules given as regular expressions require the target to be matched against a pattern.
+
+	The number of references ignored by each pattern or rule, and for each target,
+	are counted separately for each document in :attr:`~.doc_counts`.
+
+	:param patterns: Regular expressions which are matched (with :func:`re.match`) against the target of any reference.
+	:param rules: Rules for references in specific domains and of specific types.
+	"""
+
+	#: Mapping of document names to the number of references in that document ignored by each pattern or rule,
+	#: and for each target (as ``domain:type:target``).
+	doc_counts: Dict[str, Tuple[Counter, Counter]]
+
+	def __init__(self, patterns: Iterable[str], rules: Iterable[Mapping[str, Any]] = ()):
+		self.patterns: List[str] = list(patterns)
+		self._rules: Dict[Tuple[Optional[str], Optional[str]], _RuleSet] = {}
+		self._cache: Dict[Tuple[str, str, str], Optional[str]] = {}
+		self.doc_counts = {}
+
+		for pattern in self.patterns:
+			self._get_rules(None, None).add_regex(pattern)
+
+		for rule in rules:
+			unknown_keys = set(rule) - _rule_keys
+			if unknown_keys:
+				raise ConfigError(f"Unknown keys in 'ignore_missing_xref_rules' entry: {', '.join(sorted(unknown_keys))}")
+
+			for key in ("exact", "prefix", "regex"):
+				if isinstance(rule.get(key, []), str):
+					raise ConfigError(f"The {key!r} key of 'ignore_missing_xref_rules' entries must be a list of strings")
+
+			rule_set = self._get_rules(rule.get("domain"), rule.get("type"))
+
+			for target in rule.get("exact", ()):
+				rule_set.add_exact(target)
+			for prefix in rule.get("prefix", ()):
+				rule_set.add_prefix(prefix)
+			for pattern in rule.get("regex", ()):
+				rule_set.add_regex(pattern)
+
+		for rule_set in self._rules.values():
+			rule_set.match_regex = _compile_regexes(rule_set.regexes)
+
+	def _get_rules(self, domain: Optional[str], reftype: Optional[str]) -> _RuleSet:
+		key = (domain or None, reftype or None)
+		if key not in self._rules:
+			self._rules[key] = _RuleSet(f"{domain or '*'}:{reftype or '*'}")
+		return self._rules[key]
+
+	def match(self, target: str, domain: str = '', reftype: str = '') -> Optional[str]:
+		"""
+		Returns a label for the pattern or rule which matches an unresolved cross reference to ``target``,
+		or :py:obj:`None` if the warning should not be ignored.
+
+		:param target:
+		:param domain: The domain of the reference, e.g. ``'py'``.
+		:param reftype: The type of the reference, e.g. ``'class'``.
+		"""  # noqa: D400
+
+		cache_key = (domain, reftype, target)
+
+		try:
+			return self._cache[cache_key]
+		except KeyError:
+			pass
+
+		domain_key, type_key = domain or None, reftype or None
+		label = None
+
+		for key in ((domain_key, type_key), (domain_key, None), (None, type_key), (None, None)):
+			rule_set = self._rules.get(key)
+			if rule_set is not None:
+				label = rule_set.match(target)
+				if label is not None:
+					break
+
+		self._cache[cache_key] = label
+		return label
+
+	def __call__(self, target: str, domain: str = '', reftype: str = '', docname: str = '') -> bool:
+		"""
+		Returns whether the warning for an unresolved cross reference to ``target`` should be ignored,
+		and counts the reference if so.
+
+		:param target:
+		:param domain: The domain of the reference, e.g. ``'py'``.
+		:param reftype: The type of the reference, e.g. ``'class'``.
+		:param docname: The document containing the reference.
+		"""  # noqa: D400
+
+		label = self.match(target, domain, reftype)
+		if label is None:
+			return False
+
+		if docname not in self.doc_counts:
+			self.doc_counts[docname] = (Counter(), Counter())
+
+		pattern_counts, target_counts = self.doc_counts[docname]
+		pattern_counts[label] += 1
+		target_counts[f"{domain}:{reftype}:{target}"] += 1
+		return True
+
+	def get_report(self, doc_counts: Optional[Mapping[str, Tuple[Mapping, Mapping]]] = None) -> Dict[str, Any]:
+		"""
+		Returns the number of references ignored by each pattern or rule, and for each target.
+
+		The ``unused`` key lists the patterns and rules which did not match any reference.
+
+		:param doc_counts: The counts for each document, in the same form as :attr:`~.doc_counts`.
+			Defaults to the references counted by this matcher.
+		"""
+
+		if doc_counts is None:
+			doc_counts = self.doc_counts
+
+		pattern_counts: Counter = Counter()
+		target_counts: Counter = Counter()
+
+		for doc_pattern_counts, doc_target_counts in doc_counts.values():
+			pattern_counts.update(doc_pattern_counts)
+			target_counts.update(doc_target_counts)
+
+		labels = [label for rule_set in self._rules.values() for label in rule_set.labels()]
+
+		return {
+				"patterns": dict(sorted(pattern_counts.items())),
+				"targets": dict(sorted(target_counts.items())),
+				"unused": sorted(label for label in labels if label not in pattern_counts),
+				}
+
+
+def compile_patterns(app: Sphinx, config: Config) -> None:
+	"""
+	Compile the patterns and rules in the ``ignore_missing_xrefs`` and ``ignore_missing_xref_rules`` options.
+
+	:param app: The Sphinx application.
+	:param config: The Sphinx configuration.
+	"""
+
+	app.missing_xref_matcher = MissingXrefMatcher(  # type: ignore
+			getattr(config, "ignore_missing_xrefs", []),
+			getattr(config, "ignore_missing_xref_rules", []),
+			)
 
 
 def handle_missing_xref(
@@ -50,7 +341,7 @@ def handle_missing_xref(
 		contnode: nodes.Node,
 		) -> None:
 	"""
-	Skip warnings for unresolved cross references if the target matches one of the given patterns.
+	Skip warnings for unresolved cross references if the target matches one of the given patterns or rules.
 
 	:param app: The Sphinx application.
 	:param env: The Sphinx build environment.
@@ -61,12 +352,118 @@ def handle_missing_xref(
 	if not isinstance(node, nodes.Element):
 		return
 
-	for pattern in getattr(env.config, "ignore_missing_xrefs", []):
-		if re.match(pattern, node.get("reftarget", '')):
-			raise NoUri
+	matcher = getattr(app, "missing_xref_matcher", None)
+	if matcher is None:
+		compile_patterns(app, env.config)
+		matcher = app.missing_xref_matcher  # type: ignore
+
+	docname = node.get("refdoc", env.docname)
+
+	if matcher(node.get("reftarget", ''), node.get("refdomain", ''), node.get("reftype", ''), docname):
+		raise NoUri
+
+
+# The counts for each document are stored in this file in the doctree directory between builds.
+# They cannot be stored in the environment, as it is pickled before the documents are written.
+_counts_filename = "missing_xref_counts.json"
+
+
+def load_counts(app: Sphinx) -> None:
+	"""
+	Load the number of references ignored in each document from the previous build.
+
+	:param app: The Sphinx application.
+	"""
+
+	counts_file = PathPlus(app.doctreedir) / _counts_filename
+	app.missing_xref_counts = {}  # type: ignore
+
+	if not app.config.ignore_missing_xrefs_report or app.env is None or not app.env.all_docs:
+		# The environment is new, so every document will be written again.
+		return
+
+	try:
+		app.missing_xref_counts = json.loads(counts_file.read_text())  # type: ignore
+	except (OSError, ValueError):
+		pass
+
+
+def purge_counts(app: Sphinx, env: BuildEnvironment, docname: str) -> None:
+	"""
+	Remove the number of references ignored in a document which has been removed or is to be read again.
+
+	:param app: The Sphinx application.
+	:param env: The Sphinx build environment.
+	:param docname: The name of the document.
+	"""
+
+	getattr(app, "missing_xref_counts", {}).pop(docname, None)
+
+
+def update_counts(app: Sphinx, doctree: nodes.document, docname: str) -> None:
+	"""
+	Replace the number of references ignored in the documents which have just been resolved
+	with those counted while resolving them.
+
+	:param app: The Sphinx application.
+	:param doctree:
+	:param docname: The name of the document.
+	"""  # noqa: D400
+
+	matcher = getattr(app, "missing_xref_matcher", None)
+	if matcher is None or not hasattr(app, "missing_xref_counts"):
+		return
+
+	# Builders such as LaTeX resolve a single doctree containing several documents.
+	docnames = {docname}
+	docnames.update(node["docname"] for node in doctree.traverse(addnodes.start_of_file))
+
+	for name in docnames:
+		pattern_counts, target_counts = matcher.doc_counts.pop(name, ({}, {}))
+		app.missing_xref_counts[name] = (dict(pattern_counts), dict(target_counts))  # type: ignore
+
+
+def write_report(app: Sphinx, exception: Optional[Exception] = None) -> None:
+	"""
+	Write the number of references ignored by each pattern or rule, and for each target,
+	to the JSON file given by the ``ignore_missing_xrefs_report`` option.
+
+	The counts from this build are combined with those from the previous build for documents which were not written,
+	so the report covers every document after an incremental build too.
+
+	:param app: The Sphinx application.
+	:param exception: Any exception which occurred and caused Sphinx to abort.
+	"""  # noqa: D400
+
+	if exception:  # pragma: no cover
+		return
+
+	filename = app.config.ignore_missing_xrefs_report
+	matcher = getattr(app, "missing_xref_matcher", None)
+	doc_counts = getattr(app, "missing_xref_counts", None)
+
+	if not filename or matcher is None or doc_counts is None:
+		return
+
+	# Any references counted outside of a resolved doctree.
+	for name, (pattern_counts, target_counts) in matcher.doc_counts.items():
+		doc_counts[name] = (dict(pattern_counts), dict(target_counts))
+	matcher.doc_counts.clear()
 
+	for name in list(doc_counts):
+		if name not in app.env.all_docs:
+			del doc_counts[name]
 
-def setup(app: Sphinx):
+	counts_file = PathPlus(app.doctreedir) / _counts_filename
+	counts_file.parent.maybe_make(parents=True)
+	counts_file.write_clean(json.dumps(doc_counts, separators=(',', ':')))
+
+	report_file = PathPlus(app.outdir) / filename
+	report_file.parent.maybe_make(parents=True)
+	report_file.write_clean(json.dumps(matcher.get_report(doc_counts), separators=(',', ':')))
+
+
+def setup(app: Sphinx) -> Dict[str, Any]:
 	"""
 	Setup Sphinx Extension.
 
@@ -79,4 +476,19 @@ def setup(app: Sphinx):
 			rebuild="env",
 			types=[list],  # list of strings
 			)
+	app.add_config_value(
+			"ignore_missing_xref_rules",
+			default=[],
+			rebuild="env",
+			types=[list],  # list of dicts
+			)
+	app.add_config_value("ignore_missing_xrefs_report", default=None, rebuild='', types=[str])
+	app.connect("config-inited", compile_patterns)
+	app.connect("builder-inited", load_counts)
+	app.connect("env-purge-doc", purge_counts)
+	app.connect("doctree-resolved", update_counts)
+	app.connect("build-finished", write_report)
 	app.connect("missing-reference", handle_missing_xref, priority=950)
+
+	# The report counts are only updated in the main process, where missing references are resolved.
+	return {"parallel_read_safe": True, "parallel_write_safe": True}
@@ -58,3 +58,5 @@ def setup(app: Sphinx):
 			)
 
 	app.setup_extension("sphinx_packaging.peps")
+
+	return {"parallel_read_safe": True, "parallel_write_safe": True}
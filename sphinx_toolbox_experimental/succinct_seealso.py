@@ -54,3 +54,5 @@ def setup(app: Sphinx):
 			)
 
 	app.setup_extension("sphinx_toolbox.latex.succinct_seealso")
+
+	return {"parallel_read_safe": True, "parallel_write_safe": True}